@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gunicorn入口
+使用多线程worker运行Web服务器，替代Werkzeug开发服务器：
+
+    gunicorn -w 1 --threads 100 -b 0.0.0.0:5000 gunicorn_app:app
+
+只能使用一个worker进程：摄像头、串口和Socket.IO会话状态都在进程内，
+多个进程会争用同一摄像头和串口。视觉与控制线程是真实的CPU密集线程，
+不能使用gevent/eventlet协程worker
+"""
+
+import atexit
+
+from web_server import WebRobotController
+
+controller = WebRobotController()
+app = controller.app
+
+atexit.register(controller._cleanup)
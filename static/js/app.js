@@ -150,6 +150,10 @@ class RobotController {
                 this.pickupControl.handlePickupStatusUpdate(data);
             });
             
+            this.socketManager.setEventHandler('stats_update', (data) => {
+                this.pickupControl.handleStatsUpdate(data);
+            });
+            
             this.socketManager.setEventHandler('emergency_stop', (data) => {
                 this.messageHandler.showMessage(data.message, 'warning');
             });
@@ -330,7 +330,6 @@
             console.log('球跟踪更新:', data);
             this.currentTarget = data.target_ball;
             this.currentState = data.state || this.currentState;
-            this.stats = data.stats || this.stats;
             
             // 更新目标距离显示
             const targetDistance = document.getElementById('target-distance');
@@ -347,6 +346,13 @@
             this.updatePickupUI();
         }
         
+        // 处理统计信息更新事件（服务端定期发送）
+        handleStatsUpdate(data) {
+            // 服务端只发送有变化的统计项，合并到已有统计中
+            this.stats = Object.assign({}, this.stats, data);
+            this.updatePickupUI();
+        }
+        
         // 处理球对准中心事件
         handleBallCentered(data) {
             this.messageHandler.showMessage(data.message, 'success');
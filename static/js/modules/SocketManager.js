@@ -87,6 +87,29 @@
             console.log('收到无球检测事件:', data);
             this.handleEvent('no_ball_detected', data);
         });
+        
+        this.socket.on('state_change', (data) => {
+            this.handleEvent('state_change', data);
+        });
+        
+        this.socket.on('pickup_status_update', (data) => {
+            this.handleEvent('pickup_status_update', data);
+        });
+        
+        this.socket.on('stats_update', (data) => {
+            this.handleEvent('stats_update', data);
+        });
+        
+        this.socket.on('emergency_stop', (data) => {
+            this.handleEvent('emergency_stop', data);
+        });
+        
+        // 同一检测帧内的多个事件合并发送: [[事件名, 数据], ...]
+        this.socket.on('frame_batch', (events) => {
+            for (const [eventType, data] of events) {
+                this.handleEvent(eventType, data);
+            }
+        });
     }
     
     // 事件处理器
@@ -131,10 +131,12 @@
         const detectionCount = document.getElementById('detection-count');
         const fpsDisplay = document.getElementById('fps-display');
         const detectionTime = document.getElementById('detection-time');
+        const skipFrames = document.getElementById('skip-frames');
         
         if (detectionCount) detectionCount.textContent = `检测: ${data.boxes}`;
         if (fpsDisplay) fpsDisplay.textContent = `FPS: ${data.fps.toFixed(1)}`;
         if (detectionTime) detectionTime.textContent = `耗时: ${data.detection_time.toFixed(0)}ms`;
+        if (skipFrames && data.skip_frames !== undefined) skipFrames.textContent = `跳帧: ${data.skip_frames}`;
     }
     
     // 更新里程计显示
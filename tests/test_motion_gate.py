@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+运动门控测试
+在项目根目录运行: python -m tests.test_motion_gate（或 pytest tests）
+"""
+
+import numpy as np
+
+from vision.motion_gate import MotionGate
+
+BOXES = np.array([[10, 10, 50, 50]], dtype=np.float32)
+SCORES = np.array([0.9], dtype=np.float32)
+
+
+def _frame(ball_x=None):
+    """640x480灰色背景，可选在 ball_x 处画一个约20像素的亮色方块（模拟网球）"""
+    frame = np.full((480, 640, 3), 100, dtype=np.uint8)
+    if ball_x is not None:
+        frame[230:250, ball_x:ball_x + 20] = (60, 230, 200)
+    return frame
+
+
+def _gate_with_result(frame, now=0.0):
+    """对 frame 做一次检查和推理记录，返回门控"""
+    gate = MotionGate()
+    assert gate.check(frame, now) is None
+    gate.update(BOXES, SCORES, now)
+    return gate
+
+
+def test_static_frame_reuses_result():
+    """静止画面在 max_age 内复用缓存结果"""
+    gate = _gate_with_result(_frame())
+    boxes, scores = gate.check(_frame(), 0.1)
+    assert boxes is BOXES and scores is SCORES
+    assert gate.skipped_count == 1
+
+
+def test_result_expires_after_max_age():
+    """超过 max_age 后必须重新推理"""
+    gate = _gate_with_result(_frame())
+    assert gate.check(_frame(), gate.max_age - 0.01) is not None
+    assert gate.check(_frame(), gate.max_age + 0.01) is None
+
+
+def test_invalidate_forces_inference():
+    """invalidate 后下一帧必定重新推理"""
+    gate = _gate_with_result(_frame())
+    gate.invalidate()
+    assert gate.check(_frame(), 0.1) is None
+
+
+def test_small_moving_blob_is_not_gated():
+    """小目标进入或移动时不复用结果（整帧平均差值很小，但局部像素变化明显）"""
+    gate = _gate_with_result(_frame())
+    assert gate.check(_frame(ball_x=300), 0.1) is None
+
+    gate = _gate_with_result(_frame(ball_x=300))
+    assert gate.check(_frame(ball_x=340), 0.1) is None
+
+
+def test_sensor_noise_is_gated():
+    """轻微的全图噪声不触发重新推理"""
+    gate = _gate_with_result(_frame())
+    noise = np.random.default_rng(0).integers(-3, 4, size=(480, 640, 3))
+    noisy = np.clip(_frame().astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    assert gate.check(noisy, 0.1) is not None
+
+
+if __name__ == '__main__':
+    test_static_frame_reuses_result()
+    test_result_expires_after_max_age()
+    test_invalidate_forces_inference()
+    test_small_moving_blob_is_not_gated()
+    test_sensor_noise_is_gated()
+    print("运动门控测试通过")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+检测器构造冒烟测试
+以桩模块替代 tflite_runtime 和 ncnn，只检查构造流程，无需真实模型和推理库
+在项目根目录运行: python -m tests.test_tennis_detector（或 pytest tests）
+"""
+
+import sys
+import types
+
+
+class _StubNet:
+    """ncnn.Net 的最小桩实现"""
+
+    def __init__(self):
+        self.opt = types.SimpleNamespace()
+
+    def load_param(self, path):
+        pass
+
+    def load_model(self, path):
+        pass
+
+
+def _install_stub_modules():
+    """注册桩模块，已安装真实库时不覆盖"""
+    if 'tflite_runtime' not in sys.modules:
+        tflite_runtime = types.ModuleType('tflite_runtime')
+        tflite_runtime.interpreter = types.ModuleType('tflite_runtime.interpreter')
+        sys.modules['tflite_runtime'] = tflite_runtime
+        sys.modules['tflite_runtime.interpreter'] = tflite_runtime.interpreter
+    if 'ncnn' not in sys.modules:
+        ncnn = types.ModuleType('ncnn')
+        ncnn.Net = _StubNet
+        sys.modules['ncnn'] = ncnn
+
+
+def test_create_ncnn_detector():
+    """NCNN检测器构造完成且量化参数为浮点默认值"""
+    _install_stub_modules()
+    from vision.tennis_detector import NCNNTennisDetector, create_detector
+
+    detector = create_detector('foo_ncnn_model', input_size=320, num_threads=2)
+
+    assert isinstance(detector, NCNNTennisDetector)
+    assert detector.input_width == detector.input_height == 320
+    assert (detector.input_scale, detector.input_zero_point) == (1.0, 0)
+    assert (detector.output_scale, detector.output_zero_point) == (1.0, 0)
+
+
+if __name__ == '__main__':
+    test_create_ncnn_detector()
+    print("检测器构造测试通过")
@@ -13,7 +13,7 @@ class CameraConfig:
     """摄像头配置管理类"""
     
     DEFAULT_CONFIG = {
-        "camera": {"index": 0, "fps": 30, "buffer_size": 5},
+        "camera": {"index": 0, "fps": 30, "buffer_size": 5, "fourcc": "MJPG"},
         "image_settings": {"brightness": 128, "contrast": 128, "saturation": 128, "exposure": -6},
         "detection": {"confidence_threshold": 0.6, "iou_threshold": 0.5}
     }
@@ -96,6 +96,11 @@ class CameraManager:
             print(f"错误: 无法打开摄像头 {camera_index}")
             return False
         
+        # 优先使用MJPG格式：USB带宽占用小，同分辨率下帧率更高（需在设置分辨率之前设置）
+        fourcc = camera_config.get("fourcc", "MJPG")
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        
         # 设置摄像头分辨率
         if self.target_width and self.target_height:
             print(f"设置摄像头分辨率为: {self.target_width}x{self.target_height}")
@@ -156,18 +161,12 @@ class CameraManager:
         if not self.cap:
             return False, None
             
-        frame = None
-        ret = False
-        
-        # 根据skip_frames参数跳过相应数量的帧
-        for i in range(max(1, self.skip_frames)):
-            ret, current_frame = self.cap.read()
-            if ret:
-                frame = current_frame
-            else:
-                break
-        
-        return ret, frame
+        # 根据skip_frames参数跳过相应数量的帧，跳过的帧只grab不解码
+        for _ in range(max(1, self.skip_frames) - 1):
+            if not self.cap.grab():
+                return False, None
+        
+        return self.cap.read()
     
     def update_adaptive_skip(self, detection_time: float, target_fps: float = 10.0):
         """
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+运动门控模块 - 画面基本静止时复用上次检测结果，跳过模型推理
+"""
+
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    基于帧差的运动门控
+
+    将画面缩小为灰度小图，与上次推理时的画面逐像素比较，
+    变化明显的像素数少于阈值且缓存结果未过期时直接返回缓存的检测结果。
+    按像素计数而不是整帧平均差值，小目标（如滚入画面的网球）也能触发重新推理
+    """
+
+    def __init__(self, pixel_threshold=15, min_changed_pixels=3, max_age=0.5, size=(80, 60)):
+        """
+        初始化运动门控
+
+        Args:
+            pixel_threshold: 单个像素的灰度差阈值（0~255），超过该值视为该像素变化
+            min_changed_pixels: 变化像素数达到该值时视为画面运动
+            max_age: 缓存检测结果的最长复用时间（秒），超过后强制重新推理
+            size: 帧差比较使用的小图尺寸 (宽, 高)
+        """
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_pixels = min_changed_pixels
+        self.max_age = max_age
+        self.size = size
+
+        self._reference_small = None  # 上次推理时的画面
+        self._current_small = None    # 最近一次检查的画面
+        self._cached_result = None
+        self._cached_time = 0.0
+        self.skipped_count = 0
+
+    def invalidate(self):
+        """使缓存失效（如机器人开始运动），下一帧必定重新推理"""
+        self._cached_result = None
+
+    def check(self, frame, now=None):
+        """
+        检查当前帧是否可以复用缓存的检测结果
+
+        Args:
+            frame: 当前BGR帧
+            now: 当前单调时钟时间，None表示自动获取
+
+        Returns:
+            可复用时返回缓存的 (boxes, scores)，否则返回None
+        """
+        if now is None:
+            now = time.monotonic()
+
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        self._current_small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        cached_result = self._cached_result
+        if cached_result is None or self._reference_small is None:
+            return None
+        if now - self._cached_time > self.max_age:
+            return None
+
+        diff = cv2.absdiff(self._current_small, self._reference_small)
+        if np.count_nonzero(diff > self.pixel_threshold) >= self.min_changed_pixels:
+            return None
+
+        self.skipped_count += 1
+        return cached_result
+
+    def update(self, boxes, scores, now=None):
+        """
+        记录一次实际推理的结果，以最近检查的画面作为比较基准
+
+        Args:
+            boxes: 检测框数组
+            scores: 置信度数组
+            now: 当前单调时钟时间，None表示自动获取
+        """
+        self._reference_small = self._current_small
+        self._cached_result = (boxes, scores)
+        self._cached_time = time.monotonic() if now is None else now
@@ -13,7 +13,8 @@ from datetime import datetime
 class TennisDetector:
     """网球检测器类，负责模型加载、推理和结果处理"""
     
-    def __init__(self, model_path, confidence_threshold=0.5, iou_threshold=0.5):
+    def __init__(self, model_path, confidence_threshold=0.5, iou_threshold=0.5, prefer_quantized=True,
+                 input_size=None, top_k=None, num_threads=None, delegate_path=None):
         """
         初始化网球检测器
         
@@ -21,18 +22,76 @@ class TennisDetector:
             model_path: TensorFlow Lite模型路径
             confidence_threshold: 置信度阈值
             iou_threshold: NMS的IOU阈值
+            prefer_quantized: 存在同名int8量化模型时是否优先使用
+            input_size: 网络输入边长（如224、192），None表示使用模型自带尺寸
+            top_k: 最多保留的检测数（按置信度），None表示不限制
+            num_threads: 推理线程数，None表示使用全部CPU核心
+            delegate_path: 硬件加速委托库（如Coral的 libedgetpu.so.1），None表示仅用CPU
         """
-        self.model_path = model_path
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.delegate_path = delegate_path
+        self.prefer_quantized = prefer_quantized
+        self.input_size = input_size
+        self.model_path = self._resolve_model_path(model_path)
         self.confidence_threshold = confidence_threshold
         self.iou_threshold = iou_threshold
+        self.top_k = top_k
+        self._label_sprites = {}  # 置信度(保留两位小数) -> 预渲染的标签图块
+        self._resize_buffer = None  # 预处理缩放结果的复用缓冲区
         
         self._load_model()
         self._print_model_info()
         
+    def _resolve_model_path(self, model_path):
+        """
+        解析实际使用的模型路径
+        
+        model_float32_xxx.tflite 同目录下存在 model_int8_xxx.tflite 时自动切换到量化模型，
+        int8模型在ARM上推理更快且精度损失可忽略
+        
+        Args:
+            model_path: 配置的模型路径
+            
+        Returns:
+            实际加载的模型路径
+        """
+        model_dir, model_name = os.path.split(model_path)
+        if not self.prefer_quantized or 'float32' not in model_name:
+            return model_path
+        
+        quantized_path = os.path.join(model_dir, model_name.replace('float32', 'int8', 1))
+        if os.path.exists(quantized_path):
+            print(f"检测到int8量化模型，自动使用: {quantized_path}")
+            return quantized_path
+        return model_path
+        
+    def _create_interpreter(self):
+        """
+        创建TFLite解释器
+        
+        多线程运行CPU内核（浮点模型默认走XNNPACK加速内核），
+        配置了委托库时加载硬件委托，加载失败则退回CPU
+        
+        Returns:
+            tflite.Interpreter 实例
+        """
+        delegates = None
+        if self.delegate_path:
+            try:
+                delegates = [tflite.load_delegate(self.delegate_path)]
+                print(f"已加载推理委托: {self.delegate_path}")
+            except (ValueError, OSError) as e:
+                print(f"警告: 推理委托 {self.delegate_path} 加载失败，使用CPU推理: {e}")
+        
+        return tflite.Interpreter(model_path=self.model_path, num_threads=self.num_threads,
+                                  experimental_delegates=delegates)
+        
     def _load_model(self):
         """加载TensorFlow Lite模型并获取输入输出信息"""
         try:
-            self.interpreter = tflite.Interpreter(model_path=self.model_path)
+            self.interpreter = self._create_interpreter()
+            if self.input_size:
+                self._resize_input(self.input_size)
             self.interpreter.allocate_tensors()
             
             # 获取输入输出详情
@@ -61,6 +120,9 @@ class TennisDetector:
             self.output_zero_point = output_zero_points[0] if len(output_zero_points) > 0 else 0
             self.output_dtype = self.output_details[0]['dtype']
             
+            # 缓存输入索引和输出张量访问器，推理时跳过每次的字典查找和输出拷贝
+            self._input_index = self.input_details[0]['index']
+            self._output_tensor = self.interpreter.tensor(self.output_details[0]['index'])
             
         except Exception as e:
             print(f"模型加载失败: {e}")
@@ -68,6 +130,30 @@ class TennisDetector:
             traceback.print_exc()
             raise
         
+    def _resize_input(self, input_size):
+        """
+        将模型输入重设为指定边长，推理量随边长平方下降
+        
+        需要模型导出时支持对应尺寸（如 imgsz=224），不支持时保持模型默认尺寸
+        
+        Args:
+            input_size: 目标输入边长
+        """
+        input_detail = self.interpreter.get_input_details()[0]
+        shape = input_detail['shape']
+        if shape[1] == input_size and shape[2] == input_size:
+            return
+        
+        try:
+            self.interpreter.resize_tensor_input(
+                input_detail['index'], [1, input_size, input_size, shape[3]], strict=False
+            )
+            self.interpreter.allocate_tensors()
+            print(f"模型输入尺寸已调整为: {input_size}x{input_size}")
+        except Exception as e:
+            print(f"警告: 模型不支持输入尺寸 {input_size}，使用默认尺寸: {e}")
+            self.interpreter = self._create_interpreter()
+        
     def _print_model_info(self):
         """打印模型信息"""
         print(f"模型输入尺寸: {self.input_width}x{self.input_height}")
@@ -76,13 +162,26 @@ class TennisDetector:
         print(f"输出数据类型: {self.output_dtype}")
         print(f"输出量化参数 - Scale: {self.output_scale}, Zero Point: {self.output_zero_point}")
         print(f"置信度阈值: {self.confidence_threshold}")
+        print(f"推理线程数: {self.num_threads}")
+        
+    def create_input_buffer(self):
+        """
+        创建与模型输入匹配的预分配张量，可配合 preprocess_image(out=...) 复用
         
-    def preprocess_image(self, image):
+        Returns:
+            形状为 (1, H, W, 3) 的空数组
+        """
+        return np.empty((1, self.input_height, self.input_width, 3), dtype=self.input_dtype)
+    
+    def preprocess_image(self, image, out=None):
         """
         图像预处理
         
+        缩放结果写入复用的缓冲区，同一检测器的预处理需在同一线程中调用
+        
         Args:
             image: 原始图像
+            out: 可选的预分配输入张量（见 create_input_buffer），提供时结果直接写入
             
         Returns:
             processed_image: 预处理后的图像
@@ -90,7 +189,14 @@ class TennisDetector:
         # 调整图像尺寸
         current_height, current_width = image.shape[:2]
         if current_width != self.input_width or current_height != self.input_height:
-            resized_image = cv2.resize(image, (self.input_width, self.input_height))
+            # 缩小时使用INTER_AREA，质量更好且速度相近
+            interpolation = cv2.INTER_AREA if current_width > self.input_width else cv2.INTER_LINEAR
+            buffer = self._resize_buffer
+            if buffer is None or buffer.dtype != image.dtype or buffer.shape[2:] != image.shape[2:]:
+                buffer = np.empty((self.input_height, self.input_width) + image.shape[2:], dtype=image.dtype)
+                self._resize_buffer = buffer
+            resized_image = cv2.resize(image, (self.input_width, self.input_height), dst=buffer,
+                                       interpolation=interpolation)
         else:
             resized_image = image
         
@@ -100,12 +206,66 @@ class TennisDetector:
             input_image = np.array(resized_image, dtype=np.float32) / 255.0
             input_image = input_image / self.input_scale + self.input_zero_point
             input_image = np.clip(input_image, -128, 127).astype(np.int8)
+        elif out is not None:
+            # float32模型预处理，直接写入预分配张量
+            np.multiply(resized_image, np.float32(1.0 / 255.0), out=out[0], casting='unsafe')
+            return out
         else:
             # float32模型预处理
             input_image = np.array(resized_image, dtype=np.float32) / 255.0
         
+        if out is not None:
+            out[0] = input_image
+            return out
         return np.expand_dims(input_image, axis=0)
     
+    def _empty_result(self):
+        """返回空的检测结果"""
+        return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32)
+    
+    def _apply_nms(self, boxes_xywh, scores):
+        """
+        单类别NMS
+        
+        先按置信度阈值过滤候选框，再按置信度从高到低逐个保留并抑制重叠框，
+        收集到 top_k 个结果后提前结束
+        
+        Args:
+            boxes_xywh: 候选框数组 (N, 4)，每行为 (x_center, y_center, width, height)
+            scores: 置信度数组 (N,)
+            
+        Returns:
+            保留下来的候选框索引数组，按置信度降序
+        """
+        candidates = np.flatnonzero(scores >= self.confidence_threshold)
+        if candidates.size <= 1:
+            return candidates
+        
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        x_center, y_center, width, height = boxes_xywh[order].T
+        x1 = x_center - width * 0.5
+        y1 = y_center - height * 0.5
+        x2 = x_center + width * 0.5
+        y2 = y_center + height * 0.5
+        areas = width * height
+        
+        keep = []
+        remaining = np.arange(order.size)
+        while remaining.size > 0:
+            i = remaining[0]
+            keep.append(order[i])
+            if self.top_k is not None and len(keep) >= self.top_k:
+                break
+            
+            rest = remaining[1:]
+            inter_w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+            inter_h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+            inter = inter_w * inter_h
+            iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+            remaining = rest[iou <= self.iou_threshold]
+        
+        return np.asarray(keep, dtype=np.int64)
+    
     def postprocess_output(self, output, original_width, original_height):
         """
         后处理模型输出
@@ -116,13 +276,13 @@ class TennisDetector:
             original_height: 原始图像高度
             
         Returns:
-            boxes: 检测框列表 [(x1, y1, x2, y2), ...]
-            scores: 置信度列表
+            boxes: 检测框数组 (N, 4)，int32，每行为 (x1, y1, x2, y2)
+            scores: 置信度数组 (N,)，float32
         """
         try:
             if output.shape[0] == 0:
                 print("警告: 模型输出为空")
-                return [], []
+                return self._empty_result()
                 
             output = output[0].T
             
@@ -133,41 +293,25 @@ class TennisDetector:
             
         except Exception as e:
             print(f"后处理解析输出时出错: {e}")
-            return [], []
+            return self._empty_result()
         
         # NMS去重
-        indices = cv2.dnn.NMSBoxes(
-            boxes_xywh.tolist(), 
-            scores.tolist(), 
-            self.confidence_threshold, 
-            self.iou_threshold
-        )
+        indices = self._apply_nms(boxes_xywh, scores)
+        if indices.size == 0:
+            return self._empty_result()
         
-        filtered_boxes = []
-        filtered_scores = []
+        # 整体转换为绝对坐标并限制在图像范围内
+        x_center, y_center, width, height = boxes_xywh[indices].T
+        scale = np.array([original_width, original_height, original_width, original_height], dtype=np.float32)
+        boxes_xyxy = np.stack([
+            x_center - width * 0.5,
+            y_center - height * 0.5,
+            x_center + width * 0.5,
+            y_center + height * 0.5
+        ], axis=1) * scale
+        boxes_xyxy = np.clip(boxes_xyxy.astype(np.int32), 0, scale.astype(np.int32))
         
-        # 检查indices是否为空或格式问题
-        if len(indices) > 0 and indices is not None:
-            # 处理不同版本OpenCV返回格式的差异
-            if isinstance(indices, tuple):
-                indices_list = indices
-            else:
-                indices_list = indices.flatten() if hasattr(indices, 'flatten') else indices
-                
-            for i in indices_list:
-                if scores[i] >= self.confidence_threshold:
-                    x_center, y_center, width, height = boxes_xywh[i]
-                    
-                    # 转换为绝对坐标并限制在图像范围内
-                    x1 = max(0, min(int((x_center - width / 2) * original_width), original_width))
-                    y1 = max(0, min(int((y_center - height / 2) * original_height), original_height))
-                    x2 = max(0, min(int((x_center + width / 2) * original_width), original_width))
-                    y2 = max(0, min(int((y_center + height / 2) * original_height), original_height))
-                    
-                    filtered_boxes.append((x1, y1, x2, y2))
-                    filtered_scores.append(scores[i])
-        
-        return filtered_boxes, filtered_scores
+        return boxes_xyxy, scores[indices].astype(np.float32)
     
     def detect(self, image):
         """
@@ -180,17 +324,41 @@ class TennisDetector:
             boxes: 检测框列表
             scores: 置信度列表
         """
+        original_height, original_width = image.shape[:2]
         try:
-            original_height, original_width = image.shape[:2]
             # 预处理
             input_image = self.preprocess_image(image)
+        except Exception as e:
+            print(f"检测过程中出错: {e}")
+            import traceback
+            traceback.print_exc()
+            return self._empty_result()
+        
+        return self.detect_preprocessed(input_image, original_width, original_height)
+    
+    def detect_preprocessed(self, input_image, original_width, original_height):
+        """
+        对已预处理的输入张量执行推理和后处理
+        
+        预处理可在其他线程中提前完成（见 preprocess_image），与推理形成流水线
+        
+        Args:
+            input_image: preprocess_image 的输出
+            original_width: 原始图像宽度
+            original_height: 原始图像高度
             
+        Returns:
+            boxes: 检测框列表
+            scores: 置信度列表
+        """
+        try:
             # 推理
-            self.interpreter.set_tensor(self.input_details[0]['index'], input_image)
+            self.interpreter.set_tensor(self._input_index, input_image)
             self.interpreter.invoke()
             
             # 获取输出并反量化
-            output = self.interpreter.get_tensor(self.output_details[0]['index'])
+            # 输出为解释器内部缓冲区的视图（不拷贝），后处理只返回新数组，不会在下次推理时残留引用
+            output = self._output_tensor()
             
             if self.output_dtype == np.int8:
                 output = output.astype(np.float32)
@@ -203,7 +371,7 @@ class TennisDetector:
             print(f"检测过程中出错: {e}")
             import traceback
             traceback.print_exc()
-            return [], []
+            return self._empty_result()
     
     def draw_detections(self, image, boxes, scores):
         """
@@ -219,21 +387,63 @@ class TennisDetector:
         """
         annotated_image = image.copy()
         
-        for (x1, y1, x2, y2), score in zip(boxes, scores):
-            # 绘制检测框
-            cv2.rectangle(annotated_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        if boxes.shape[0] == 0:
+            return annotated_image
+        
+        # 所有检测框转为四边形顶点后一次调用绘制（与逐个 cv2.rectangle 结果相同）
+        contours = boxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+        cv2.polylines(annotated_image, contours, True, (0, 255, 0), 2)
+        
+        # 绘制置信度标签（标签背景和文本已预渲染），一次性转换为Python数值
+        for (x1, y1, _, _), score in zip(boxes.tolist(), np.asarray(scores, dtype=np.float64).tolist()):
+            self._draw_label(annotated_image, round(score, 2), x1, y1)
+        
+        return annotated_image
+    
+    def _get_label_sprite(self, score):
+        """
+        获取置信度标签图块，不同置信度最多101种，渲染一次后缓存
+        
+        Args:
+            score: 保留两位小数的置信度
             
-            # 绘制置信度标签
+        Returns:
+            绿色背景、黑色文字的标签图块
+        """
+        sprite = self._label_sprites.get(score)
+        if sprite is None:
             label = f'Tennis: {score:.2f}'
             label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-            
-            # 绘制标签背景和文本
-            cv2.rectangle(annotated_image, (x1, y1 - label_size[1] - 10), 
-                         (x1 + label_size[0], y1), (0, 255, 0), -1)
-            cv2.putText(annotated_image, label, (x1, y1 - 5), 
+            sprite = np.full((label_size[1] + 11, label_size[0] + 1, 3), (0, 255, 0), dtype=np.uint8)
+            cv2.putText(sprite, label, (0, label_size[1] + 5), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+            self._label_sprites[score] = sprite
+        return sprite
+    
+    def _draw_label(self, image, score, x, y):
+        """
+        将标签图块复制到检测框左上角上方，超出图像的部分被裁剪
         
-        return annotated_image
+        Args:
+            image: 目标图像
+            score: 保留两位小数的置信度
+            x: 检测框左上角x坐标
+            y: 检测框左上角y坐标
+        """
+        sprite = self._get_label_sprite(score)
+        sprite_height, sprite_width = sprite.shape[:2]
+        top = y + 1 - sprite_height
+        
+        dst_x0, dst_y0 = max(0, x), max(0, top)
+        dst_x1 = min(image.shape[1], x + sprite_width)
+        dst_y1 = min(image.shape[0], y + 1)
+        if dst_x1 <= dst_x0 or dst_y1 <= dst_y0:
+            return
+        
+        src_x0, src_y0 = dst_x0 - x, dst_y0 - top
+        image[dst_y0:dst_y1, dst_x0:dst_x1] = \
+            sprite[src_y0:src_y0 + dst_y1 - dst_y0, src_x0:src_x0 + dst_x1 - dst_x0]
     
     def save_screenshot(self, image, screenshot_type="full", base_dir="screenshot"):
         """
@@ -256,3 +466,153 @@ class TennisDetector:
         
         cv2.imwrite(filepath, image)
         print(f"{'完整' if screenshot_type == 'full' else '原始'}截图已保存: {filepath}")
+
+
+class NCNNTennisDetector(TennisDetector):
+    """
+    基于NCNN的网球检测器，接口与 TennisDetector 一致
+    
+    NCNN针对ARM NEON做了卷积优化，在树莓派上通常比TFLite更快。
+    模型为 Ultralytics 导出的 *_ncnn_model 目录（含 model.ncnn.param/.bin），
+    或直接指定 .param 文件（同名 .bin 放在同一目录）
+    """
+    
+    DEFAULT_INPUT_SIZE = 640  # Ultralytics 导出NCNN的默认 imgsz
+    
+    def __init__(self, model_path, confidence_threshold=0.5, iou_threshold=0.5,
+                 input_size=None, top_k=None, num_threads=None):
+        """
+        初始化NCNN网球检测器
+        
+        Args:
+            model_path: NCNN模型目录或 .param 文件路径
+            confidence_threshold: 置信度阈值
+            iou_threshold: NMS的IOU阈值
+            input_size: 网络输入边长，需与导出时的 imgsz 一致，None表示640
+            top_k: 最多保留的检测数（按置信度），None表示不限制
+            num_threads: 推理线程数，None表示使用全部CPU核心
+        """
+        super().__init__(model_path, confidence_threshold, iou_threshold,
+                         prefer_quantized=False, input_size=input_size, top_k=top_k,
+                         num_threads=num_threads)
+    
+    def _resolve_model_path(self, model_path):
+        """NCNN模型不做int8同名替换，直接使用给定路径"""
+        return model_path
+    
+    def _load_model(self):
+        """加载NCNN模型"""
+        try:
+            import ncnn
+            self._ncnn = ncnn
+            
+            if os.path.isdir(self.model_path):
+                param_path = os.path.join(self.model_path, "model.ncnn.param")
+                bin_path = os.path.join(self.model_path, "model.ncnn.bin")
+            else:
+                param_path = self.model_path
+                bin_path = os.path.splitext(self.model_path)[0] + ".bin"
+            
+            self.net = ncnn.Net()
+            self.net.opt.use_winograd_convolution = True
+            self.net.opt.num_threads = self.num_threads
+            self.net.load_param(param_path)
+            self.net.load_model(bin_path)
+            
+            self.input_width = self.input_height = self.input_size or self.DEFAULT_INPUT_SIZE
+            self.input_dtype = np.float32
+            self.output_dtype = np.float32
+            # NCNN模型为浮点推理，没有量化参数
+            self.input_scale = self.output_scale = 1.0
+            self.input_zero_point = self.output_zero_point = 0
+            self._norm_vals = [1.0 / 255.0] * 3
+            
+        except Exception as e:
+            print(f"模型加载失败: {e}")
+            import traceback
+            traceback.print_exc()
+            raise
+    
+    def create_input_buffer(self):
+        """NCNN输入由 ncnn.Mat 自行分配，不使用预分配张量"""
+        return None
+    
+    def preprocess_image(self, image, out=None):
+        """
+        图像预处理，缩放与格式转换由 from_pixels_resize 一步完成
+        
+        保持与TFLite路径相同的BGR通道顺序，不做通道交换
+        
+        Args:
+            image: 原始图像
+            out: 兼容参数，NCNN路径忽略
+            
+        Returns:
+            归一化到0~1的 ncnn.Mat
+        """
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        mat = self._ncnn.Mat.from_pixels_resize(
+            image, self._ncnn.Mat.PixelType.PIXEL_BGR,
+            width, height, self.input_width, self.input_height
+        )
+        mat.substract_mean_normalize([], self._norm_vals)
+        return mat
+    
+    def detect_preprocessed(self, input_image, original_width, original_height):
+        """
+        对已预处理的 ncnn.Mat 执行推理和后处理
+        
+        Args:
+            input_image: preprocess_image 的输出
+            original_width: 原始图像宽度
+            original_height: 原始图像高度
+            
+        Returns:
+            boxes: 检测框列表
+            scores: 置信度列表
+        """
+        try:
+            extractor = self.net.create_extractor()
+            extractor.input("in0", input_image)
+            _, output_mat = extractor.extract("out0")
+            
+            # NCNN输出为输入像素坐标 (C, N)，归一化后与TFLite输出格式 (1, C, N) 对齐
+            output = np.array(output_mat, dtype=np.float32)
+            output[0] /= self.input_width
+            output[1] /= self.input_height
+            output[2] /= self.input_width
+            output[3] /= self.input_height
+            
+            return self.postprocess_output(output[np.newaxis], original_width, original_height)
+            
+        except Exception as e:
+            print(f"检测过程中出错: {e}")
+            import traceback
+            traceback.print_exc()
+            return self._empty_result()
+
+
+def create_detector(model_path, backend=None, **kwargs):
+    """
+    按后端创建检测器
+    
+    Args:
+        model_path: 模型路径
+        backend: "tflite" 或 "ncnn"，None表示按模型路径自动判断
+        **kwargs: 传给检测器构造函数的其他参数
+        
+    Returns:
+        TennisDetector 或 NCNNTennisDetector 实例
+    """
+    if backend is None:
+        is_ncnn = model_path.rstrip("/\\").endswith(("_ncnn_model", ".param"))
+        backend = "ncnn" if is_ncnn else "tflite"
+    
+    if backend == "ncnn":
+        kwargs.pop("prefer_quantized", None)
+        kwargs.pop("delegate_path", None)
+        return NCNNTennisDetector(model_path, **kwargs)
+    if backend == "tflite":
+        return TennisDetector(model_path, **kwargs)
+    raise ValueError(f"不支持的推理后端: {backend}")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+TFLite模型导出工具
+将训练好的YOLOv8权重(.pt)导出为TFLite模型，按项目命名规则复制到 vision/model
+
+int8量化模型在树莓派(ARM NEON)上推理速度通常为float32的2~4倍，
+检测器加载 model_float32_xxx.tflite 时会自动改用同目录下的 model_int8_xxx.tflite；
+float16模型体积减半，适合带GPU委托的硬件
+"""
+
+import os
+import shutil
+
+
+def export_tflite(weights, precision="int8", imgsz=640, data=None, name=None, output_dir="vision/model"):
+    """
+    导出TFLite模型
+
+    Args:
+        weights: YOLOv8权重文件路径(.pt)
+        precision: 模型精度 "int8"、"float16" 或 "float32"
+        imgsz: 导出的网络输入边长
+        data: int8量化校准使用的数据集配置(.yaml)，None表示使用Ultralytics默认数据集
+        name: 模型名后缀，None表示使用权重文件名
+        output_dir: 输出目录
+
+    Returns:
+        导出的模型路径
+    """
+    from ultralytics import YOLO
+
+    export_args = {"format": "tflite", "imgsz": imgsz}
+    if precision == "int8":
+        export_args["int8"] = True
+        if data:
+            export_args["data"] = data
+    elif precision == "float16":
+        export_args["half"] = True
+
+    exported_path = YOLO(weights).export(**export_args)
+
+    name = name or os.path.splitext(os.path.basename(weights))[0]
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"model_{precision}_{name}.tflite")
+    shutil.copyfile(exported_path, output_path)
+    return output_path
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='TFLite模型导出工具')
+    parser.add_argument('weights', type=str, help='YOLOv8权重文件路径 (.pt)')
+    parser.add_argument('--precision', '-p', choices=['int8', 'float16', 'float32'], default='int8',
+                        help='模型精度 (默认: int8)')
+    parser.add_argument('--imgsz', type=int, default=640, help='网络输入边长 (默认: 640)')
+    parser.add_argument('--data', type=str, default=None, help='int8量化校准数据集配置 (.yaml)')
+    parser.add_argument('--name', type=str, default=None, help='模型名后缀 (默认: 权重文件名)')
+    parser.add_argument('--output-dir', type=str, default='vision/model', help='输出目录 (默认: vision/model)')
+
+    args = parser.parse_args()
+
+    try:
+        output_path = export_tflite(args.weights, args.precision, args.imgsz, args.data, args.name,
+                                    args.output_dir)
+        print(f"模型导出完成: {output_path}")
+    except ImportError:
+        print("错误: 导出需要安装ultralytics (pip install ultralytics)")
+    except Exception as e:
+        print(f"模型导出失败: {e}")
+
+
+if __name__ == "__main__":
+    main()
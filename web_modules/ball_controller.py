@@ -8,7 +8,70 @@
 import time
 import math
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import Tuple, Optional
+
+
+# 有效球记录的字段布局：检测序号、中心坐标、置信度、到屏幕中心距离的平方、面积
+# 距离只用于比较，保存平方值避免逐个开方，需要实际距离时再对目标球开方
+# 检测框为整数像素坐标，除置信度外均用int32整数计算（640x480下距离平方和面积不会溢出）
+BALL_DTYPE = np.dtype([
+    ('id', 'i4'),
+    ('cx', 'i4'),
+    ('cy', 'i4'),
+    ('score', 'f4'),
+    ('dist_sq', 'i4'),
+    ('area', 'i4')
+])
+
+# 可调控制参数的取值范围 (下限, 上限)
+PARAMETER_LIMITS = {
+    'center_tolerance': (10, 100),
+    'min_confidence': (0.1, 1.0),
+    'max_angular_speed': (0.1, 2.0),
+    'kp': (0.0001, 0.01),
+    'ki': (0, 0.001),
+    'kd': (0, 0.01),
+    'forward_speed': (0.1, 1.0)
+}
+
+
+def compute_ball_features(boxes, scores, center_x, center_y, min_confidence):
+    """
+    一次性计算所有检测框的中心、面积和到屏幕中心的距离，并按置信度过滤
+    
+    结果直接写入 BALL_DTYPE 记录数组的各字段，不生成中间数组
+    
+    Args:
+        boxes: 检测框 (N, 4)，每行为 (x1, y1, x2, y2)
+        scores: 置信度 (N,)
+        center_x: 屏幕中心x坐标（整数像素）
+        center_y: 屏幕中心y坐标（整数像素）
+        min_confidence: 最小置信度
+        
+    Returns:
+        有效球的记录数组 (M,)
+    """
+    # 检测器输出的数组直接使用，只对通过置信度过滤的框做类型转换（检测器已输出int32时不复制）
+    scores = np.asarray(scores, dtype=np.float32)
+    indices = np.flatnonzero(scores >= min_confidence)
+    boxes = np.asarray(boxes).reshape(-1, 4)[indices].astype(np.int32, copy=False)
+    x1, y1, x2, y2 = boxes.T
+    
+    balls = np.empty(indices.size, dtype=BALL_DTYPE).view(np.recarray)
+    balls.id = indices
+    balls.score = scores[indices]
+    
+    # 中心坐标取整（向下取整），与整数屏幕中心比较
+    np.add(x1, x2, out=balls.cx)
+    balls.cx >>= 1
+    np.add(y1, y2, out=balls.cy)
+    balls.cy >>= 1
+    np.multiply(x2 - x1, y2 - y1, out=balls.area)
+    dx = balls.cx - center_x
+    dy = balls.cy - center_y
+    np.add(dx * dx, dy * dy, out=balls.dist_sq)
+    
+    return balls
 
 
 class BallController:
@@ -23,14 +86,32 @@ class BallController:
         """
         self.robot_controller = robot_controller
         
+        # 缓存速度接口，避免每次发送命令都做hasattr检查
+        # 使用不构建返回字典的快速接口，异常在 _send_velocity 中统一处理
+        if robot_controller is not None and hasattr(robot_controller, 'robot_running'):
+            self._set_velocity = robot_controller.set_velocity_fast
+        else:
+            self._set_velocity = None
+        
+        # 运动门控（见 vision.motion_gate），发送非零速度时使缓存的检测结果失效
+        self.motion_gate = None
+        
+        # 命令去重：与上次发送的速度几乎相同且间隔很短时不重复写串口
+        self.command_epsilon = 1e-3     # 速度差阈值
+        self.command_refresh = 0.1      # 相同命令的最短重发间隔（秒）
+        self._last_command = None       # 上次发送的 (linear_x, linear_y, angular_z)
+        self._last_command_time = 0.0
+        
         # 屏幕参数
         self.screen_width = 640
         self.screen_height = 480
         self.screen_center_x = self.screen_width // 2
         self.screen_center_y = self.screen_height // 2
+        self._last_frame_size = (self.screen_height, self.screen_width)
         
         # 控制参数
         self.center_tolerance = 30  # 中心区域容差（像素）
+        self._center_tol_sq = self.center_tolerance ** 2  # 与距离平方比较，参数更新时刷新
         self.min_confidence = 0.6   # 最小置信度
         self.angular_speed_base = 0.05  # 基础角速度 rad/s
         self.max_angular_speed = 0.15   # 最大角速度 rad/s
@@ -42,11 +123,12 @@ class BallController:
         self.kp = 0.003  # 比例系数
         self.ki = 0.0001  # 积分系数
         self.kd = 0.001   # 微分系数
+        self._pid_gains = (self.kp, self.ki, self.kd)  # 仅在参数更新时刷新
         
-        # PID控制变量
+        # PID控制变量（计时使用单调时钟，不受系统时间调整影响）
         self.prev_error = 0
         self.integral = 0
-        self.last_time = time.time()
+        self.last_time = time.monotonic()
         
         # 检测超时参数
         self.detection_timeout = 2.0  # 检测超时时间（秒）
@@ -58,152 +140,118 @@ class BallController:
         Args:
             frame_shape: 帧尺寸 (height, width, channels)
         """
-        if frame_shape:
-            self.screen_height, self.screen_width = frame_shape[:2]
-            self.screen_center_x = self.screen_width // 2
-            self.screen_center_y = self.screen_height // 2
+        if not frame_shape:
+            return
+        
+        # 帧尺寸通常不变，只在变化时重新计算
+        frame_size = frame_shape[:2]
+        if frame_size == self._last_frame_size:
+            return
+        
+        self._last_frame_size = frame_size
+        self.screen_height, self.screen_width = frame_size
+        self.screen_center_x = self.screen_width // 2
+        self.screen_center_y = self.screen_height // 2
     
-    def filter_valid_detections(self, boxes: List, scores: List) -> List[dict]:
+    def filter_valid_detections(self, boxes: np.ndarray, scores: np.ndarray) -> np.recarray:
         """
         过滤有效的检测结果
         
         Args:
-            boxes: 检测框列表 [[x1, y1, x2, y2], ...]
-            scores: 置信度列表
+            boxes: 检测框数组 (N, 4)，也接受 [[x1, y1, x2, y2], ...] 列表
+            scores: 置信度数组 (N,)
             
         Returns:
-            有效球的信息列表
+            有效球的记录数组（BALL_DTYPE），字段可按属性访问，如 balls.cx
         """
-        valid_balls = []
-        
-        for i, (box, score) in enumerate(zip(boxes, scores)):
-            if score >= self.min_confidence:
-                # 计算球的中心点
-                x1, y1, x2, y2 = box
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
-                
-                # 计算球的尺寸
-                width = x2 - x1
-                height = y2 - y1
-                area = width * height
-                
-                # 计算到屏幕中心的距离
-                distance_to_center = math.sqrt(
-                    (center_x - self.screen_center_x) ** 2 + 
-                    (center_y - self.screen_center_y) ** 2
-                )
-                
-                ball_info = {
-                    'id': i,
-                    'box': [float(x) for x in box],
-                    'center': (float(center_x), float(center_y)),
-                    'score': float(score),
-                    'area': float(area),
-                    'distance_to_center': float(distance_to_center)
-                }
-                
-                valid_balls.append(ball_info)
-        
-        return valid_balls
+        return compute_ball_features(
+            boxes, scores, self.screen_center_x, self.screen_center_y, self.min_confidence
+        )
     
-    def select_target_ball(self, valid_balls: List[dict], selection_mode: str = 'largest') -> Optional[dict]:
+    def select_target_ball(self, valid_balls: np.recarray, selection_mode: str = 'largest') -> Optional[int]:
         """
         选择目标球
         
         Args:
-            valid_balls: 有效检测球列表
+            valid_balls: 有效检测球记录数组
             selection_mode: 选择模式 'largest'(最大检测框) 或 'nearest'(最近中心)
             
         Returns:
-            目标球信息或None
+            目标球在 valid_balls 中的索引，没有球时返回None
         """
-        if not valid_balls:
+        if valid_balls.size == 0:
             return None
         
         if selection_mode == 'largest':
             # 选择检测框最大的球（最近的球）
-            target_ball = max(valid_balls, key=lambda ball: ball['area'])
-        else:  # nearest
-            # 按到屏幕中心的距离排序，选择最近的
-            target_ball = min(valid_balls, key=lambda ball: ball['distance_to_center'])
-        
-        return target_ball
+            return int(np.argmax(valid_balls.area))
+        # nearest: 选择到屏幕中心距离最近的球
+        return int(np.argmin(valid_balls.dist_sq))
     
-    def is_ball_centered(self, target_ball: dict) -> bool:
+    def is_ball_centered(self, target_ball: np.record) -> bool:
         """
         检查球是否已经在中心区域
         
         Args:
-            target_ball: 目标球信息
+            target_ball: 目标球记录（valid_balls[index]）
             
         Returns:
             True如果球在中心区域
         """
-        distance_to_center = target_ball['distance_to_center']
-        return distance_to_center <= self.center_tolerance
+        return target_ball.dist_sq <= self._center_tol_sq
     
     
-    def calculate_control_output(self, target_ball: dict) -> dict:
+    def calculate_control_output(self, target_ball: np.record, now: Optional[float] = None) -> dict:
         """
         计算控制输出
         
         Args:
-            target_ball: 目标球信息
+            target_ball: 目标球记录（valid_balls[index]）
+            now: 当前帧的单调时钟时间，None表示自动获取
             
         Returns:
             控制信息字典
         """
-        center_x, center_y = target_ball['center']
-        distance_to_center = target_ball['distance_to_center']
+        distance_to_center = math.sqrt(target_ball.dist_sq)
         
-        # 计算控制误差（水平方向）
-        error = center_x - self.screen_center_x
+        # 计算控制误差（水平方向），只对选中的目标球转为浮点数
+        error = float(target_ball.cx - self.screen_center_x)
         
         # PID控制计算
-        angular_velocity = self._calculate_pid_control(error)
+        angular_velocity = self._calculate_pid_control(error, now)
         
         # 限制最大角速度
-        angular_velocity = max(-self.max_angular_speed, 
-                             min(self.max_angular_speed, angular_velocity))
+        max_speed = self.max_angular_speed
+        angular_velocity = min(max_speed, max(-max_speed, angular_velocity))
         
+        # 各值均已是Python float，无需再转换
         return {
-            'error': float(error),
-            'angular_velocity': float(angular_velocity),
-            'distance_to_center': float(distance_to_center)
+            'error': error,
+            'angular_velocity': angular_velocity,
+            'distance_to_center': distance_to_center
         }
     
-    def _calculate_pid_control(self, error: float) -> float:
+    def _calculate_pid_control(self, error: float, now: Optional[float] = None) -> float:
         """
         PID控制计算
         
         Args:
             error: 控制误差
+            now: 当前帧的单调时钟时间，None表示自动获取
             
         Returns:
             控制输出（角速度）
         """
-        current_time = time.time()
-        dt = current_time - self.last_time
-        
-        if dt <= 0:
-            dt = 0.01
-        
-        # 比例项
-        proportional = self.kp * error
-        
-        # 积分项
-        self.integral += error * dt
-        # 限制积分项防止积分饱和
-        self.integral = max(-100, min(100, self.integral))
-        integral_term = self.ki * self.integral
+        kp, ki, kd = self._pid_gains
+        current_time = time.monotonic() if now is None else now
+        # 下限保护：时间差为零或极小时避免微分项除零/突变
+        dt = max(current_time - self.last_time, 1e-3)
         
-        # 微分项
-        derivative = (error - self.prev_error) / dt
-        derivative_term = self.kd * derivative
+        # 积分项，限制积分项防止积分饱和
+        self.integral = min(100, max(-100, self.integral + error * dt))
         
         # PID输出
-        output = proportional + integral_term + derivative_term
+        output = kp * error + ki * self.integral + kd * (error - self.prev_error) / dt
         
         # 更新历史值
         self.prev_error = error
@@ -211,6 +259,50 @@ class BallController:
         
         return output
     
+    def _send_velocity(self, linear_x: float, linear_y: float, angular_z: float, action: str,
+                       force: bool = False) -> bool:
+        """
+        发送速度命令，机器人未运行时直接返回
+        
+        Args:
+            linear_x: X轴线速度 (m/s)
+            linear_y: Y轴线速度 (m/s)
+            angular_z: Z轴角速度 (rad/s)
+            action: 命令名称，用于错误日志
+            force: 为True时跳过命令去重，必定写入串口
+            
+        Returns:
+            True如果命令发送成功
+        """
+        if self._set_velocity is None or not self.robot_controller.robot_running:
+            return False
+        
+        if self.motion_gate is not None and (linear_x or linear_y or angular_z):
+            self.motion_gate.invalidate()
+        
+        now = time.monotonic()
+        last_command = self._last_command
+        if (not force and last_command is not None
+                and now - self._last_command_time < self.command_refresh
+                and abs(linear_x - last_command[0]) < self.command_epsilon
+                and abs(linear_y - last_command[1]) < self.command_epsilon
+                and abs(angular_z - last_command[2]) < self.command_epsilon):
+            # 与上次命令相同，机器人仍在执行，无需重复发送
+            return True
+        
+        try:
+            sent = self._set_velocity(linear_x, linear_y, angular_z)
+        except Exception as e:
+            print(f"发送{action}命令失败: {e}")
+            sent = False
+        
+        if sent:
+            self._last_command = (linear_x, linear_y, angular_z)
+            self._last_command_time = now
+        else:
+            self._last_command = None
+        return sent
+    
     def send_rotation_command(self, angular_velocity: float) -> bool:
         """
         发送旋转控制命令
@@ -221,37 +313,20 @@ class BallController:
         Returns:
             True如果命令发送成功
         """
-        if self.robot_controller and hasattr(self.robot_controller, 'robot_running') and self.robot_controller.robot_running:
-            try:
-                # 只进行旋转，不移动
-                result = self.robot_controller.set_velocity(0.0, 0.0, -angular_velocity)
-                if result.get('status') != 'success':
-                    print(f"旋转命令执行失败: {result.get('message', '未知错误')}")
-                    return False
-                return True
-            except Exception as e:
-                print(f"发送旋转命令失败: {e}")
-                return False
-        return False
+        # 只进行旋转，不移动
+        return self._send_velocity(0.0, 0.0, -angular_velocity, '旋转')
     
-    def stop_robot(self) -> bool:
+    def stop_robot(self, force: bool = False) -> bool:
         """
         停止机器人运动
         
+        Args:
+            force: 为True时跳过命令去重（如紧急停止）
+        
         Returns:
             True如果停止成功
         """
-        if self.robot_controller and hasattr(self.robot_controller, 'robot_running') and self.robot_controller.robot_running:
-            try:
-                result = self.robot_controller.set_velocity(0.0, 0.0, 0.0)
-                if result.get('status') != 'success':
-                    print(f"停止机器人失败: {result.get('message', '未知错误')}")
-                    return False
-                return True
-            except Exception as e:
-                print(f"停止机器人失败: {e}")
-                return False
-        return False
+        return self._send_velocity(0.0, 0.0, 0.0, '停止', force)
     
     def send_forward_command(self, speed: float = None) -> bool:
         """
@@ -265,18 +340,7 @@ class BallController:
         """
         if speed is None:
             speed = self.forward_speed
-            
-        if self.robot_controller and hasattr(self.robot_controller, 'robot_running') and self.robot_controller.robot_running:
-            try:
-                result = self.robot_controller.set_velocity(speed, 0.0, 0.0)
-                if result.get('status') != 'success':
-                    print(f"前进命令执行失败: {result.get('message', '未知错误')}")
-                    return False
-                return True
-            except Exception as e:
-                print(f"发送前进命令失败: {e}")
-                return False
-        return False
+        return self._send_velocity(speed, 0.0, 0.0, '前进')
     
     def send_backward_command(self, speed: float = None, duration: float = 1.0) -> bool:
         """
@@ -291,18 +355,7 @@ class BallController:
         """
         if speed is None:
             speed = self.forward_speed
-            
-        if self.robot_controller and hasattr(self.robot_controller, 'robot_running') and self.robot_controller.robot_running:
-            try:
-                result = self.robot_controller.set_velocity(-speed, 0.0, 0.0)
-                if result.get('status') != 'success':
-                    print(f"后退命令执行失败: {result.get('message', '未知错误')}")
-                    return False
-                return True
-            except Exception as e:
-                print(f"发送后退命令失败: {e}")
-                return False
-        return False
+        return self._send_velocity(-speed, 0.0, 0.0, '后退')
     
     def send_search_rotation_command(self, angular_velocity: float = None) -> bool:
         """
@@ -316,55 +369,31 @@ class BallController:
         """
         if angular_velocity is None:
             angular_velocity = self.angular_speed_base
-            
-        if self.robot_controller and hasattr(self.robot_controller, 'robot_running') and self.robot_controller.robot_running:
-            try:
-                result = self.robot_controller.set_velocity(0.0, 0.0, angular_velocity)
-                if result.get('status') != 'success':
-                    print(f"搜索旋转命令执行失败: {result.get('message', '未知错误')}")
-                    return False
-                return True
-            except Exception as e:
-                print(f"发送搜索旋转命令失败: {e}")
-                return False
-        return False
+        return self._send_velocity(0.0, 0.0, angular_velocity, '搜索旋转')
     
     def reset_pid(self):
         """重置PID控制器"""
         self.prev_error = 0
         self.integral = 0
-        self.last_time = time.time()
+        self.last_time = time.monotonic()
     
     def update_parameters(self, params: dict):
         """
         更新控制参数
         
+        参数和PID状态由跟踪周期读写，调用方需保证不与跟踪周期并发（见 BallTracker.update_parameters）
+        
         Args:
             params: 参数字典
             
         Returns:
             更新结果和当前参数
         """
-        if 'center_tolerance' in params:
-            self.center_tolerance = max(10, min(100, params['center_tolerance']))
-        
-        if 'min_confidence' in params:
-            self.min_confidence = max(0.1, min(1.0, params['min_confidence']))
-        
-        if 'max_angular_speed' in params:
-            self.max_angular_speed = max(0.1, min(2.0, params['max_angular_speed']))
-        
-        if 'kp' in params:
-            self.kp = max(0.0001, min(0.01, params['kp']))
-        
-        if 'ki' in params:
-            self.ki = max(0, min(0.001, params['ki']))
-        
-        if 'kd' in params:
-            self.kd = max(0, min(0.01, params['kd']))
-        
-        if 'forward_speed' in params:
-            self.forward_speed = max(0.1, min(1.0, params['forward_speed']))
+        for name, (low, high) in PARAMETER_LIMITS.items():
+            if name in params:
+                setattr(self, name, max(low, min(high, params[name])))
+        self._center_tol_sq = self.center_tolerance ** 2
+        self._pid_gains = (self.kp, self.ki, self.kd)
         
         # 重置PID控制器
         self.reset_pid()
@@ -8,14 +8,28 @@
 """
 
 import time
+import queue
 import threading
 import math
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import Tuple, Optional
 from enum import Enum
 from .ball_controller import BallController
 
 
+# 状态机参数的取值范围 (下限, 上限)
+STATE_PARAMETER_LIMITS = {
+    'pickup_timeout': (1.0, 10.0),
+    'backup_duration': (0.5, 5.0),
+    'search_timeout': (5.0, 30.0),
+    'rotation_speed': (0.1, 1.0)
+}
+
+# 可合并的高频事件：发送线程来不及发出时只保留合并后的最新数据
+# 状态切换、模式切换、紧急停止等控制事件始终逐条发送
+COALESCED_EVENTS = frozenset({'ball_tracking_update', 'stats_update'})
+
+
 class PickupState(Enum):
     """拾取状态枚举"""
     IDLE = "idle"                    # 空闲状态
@@ -46,16 +60,17 @@ class BallTracker:
         # 拾取模式状态
         self.pickup_mode = False
         self.current_state = PickupState.IDLE
+        self._current_state_value = self.current_state.value  # 缓存状态字符串，仅在状态切换时更新
         
         # 跟踪状态
         self.target_ball = None
         self.last_detection_time = 0
         self.last_ball_area = 0  # 用于检测球是否消失
         
-        # 连续帧检测机制
-        self.detection_history = []  # 存储最近的检测结果
-        self.max_history_frames = 3  # 保存最近3帧的检测结果
+        # 连续帧检测机制：只需维护连续计数，不保存逐帧历史（目标球本身保存在 self.target_ball）
         self.required_consecutive_frames = 3  # 需要连续3帧确认状态变化
+        self._consec_has_ball = 0  # 连续检测到球的帧数
+        self._consec_no_ball = 0   # 连续未检测到球的帧数
         
         # 状态计时器
         self.state_start_time = 0
@@ -75,58 +90,98 @@ class BallTracker:
             'successful_tracks': 0,
             'center_hits': 0,
             'balls_picked': 0,
-            'current_state': self.current_state.value,
+            'current_state': self._current_state_value,
             'last_target_distance': 0
         }
+        
+        # 统计信息不随每帧跟踪更新发送，单独以较低频率发送
+        self.stats_interval = 1.0  # 统计信息发送间隔（秒）
+        self._last_stats_emit = 0.0
+        self._sent_stats = {}  # 前端已收到的统计值，stats_update 只发送有变化的键
+        
+        # 跟踪状态更新限频，与检测帧率无关（状态切换事件不受限制）
+        self.tracking_emit_interval = 1.0 / 15  # 最多15Hz
+        self._last_tracking_emit = 0.0
+        
+        # 状态处理函数表，处理函数统一签名 (target_ball, state_duration)
+        # 以状态字符串为键：Enum的__hash__是Python层函数，字符串哈希值有缓存
+        self._state_handlers = {
+            PickupState.SEARCHING.value: self._handle_searching_state,
+            PickupState.TRACKING.value: self._handle_tracking_state,
+            PickupState.APPROACHING.value: self._handle_approaching_state,
+            PickupState.BACKING_UP.value: self._handle_backing_up_state,
+            PickupState.ROTATING_SEARCH.value: self._handle_rotating_search_state,
+            PickupState.COMPLETED.value: self._handle_completed_state
+        }
+        
+        self._tick_time = None  # 当前检测帧的单调时钟时间
+        
+        # 单个跟踪周期（_run_cycle）内产生的事件先缓存，结束时合并为一条 frame_batch 发送
+        # 只缓存跟踪线程自己的事件，Web请求线程（紧急停止、切换模式等）的事件直接发送
+        self._batching = False
+        self._pending_events = []
+        
+        # 事件由发送线程异步发出，检测/控制路径不因网络发送阻塞
+        self._emit_queue = queue.Queue()
+        # 等待发送的可合并事件数据，队列中只放事件名占位，发送时取最新数据
+        self._coalesced_payloads = {}
+        self._coalesce_lock = threading.Lock()
+        if self.socketio:
+            emit_thread = threading.Thread(target=self._emit_loop, daemon=True)
+            emit_thread.start()
+        
+        # 检测结果单槽位：视觉线程只写入最新一帧，跟踪线程取出处理，来不及处理的旧帧直接覆盖
+        # 与视觉流水线一致使用单槽位队列，队列满时丢弃旧帧，保证最新一帧不丢失
+        self._detections_queue = queue.Queue(maxsize=1)
+        self._tracker_thread = None
+        # 跟踪周期锁：跟踪线程执行周期时持有，Web请求线程切换模式/紧急停止/更新参数前获取，
+        # 保证停止命令不会被正在执行的周期发出的旋转命令覆盖，且一个周期内读到的参数一致
+        self._cycle_lock = threading.Lock()
     
     def toggle_pickup_mode(self):
         """切换拾取模式"""
-        self.pickup_mode = not self.pickup_mode
-        
-        if self.pickup_mode:
-            self._change_state(PickupState.SEARCHING)
-            self.ball_controller.reset_pid()
-            message = "拾取模式已开启，开始搜索网球"
-        else:
-            self._change_state(PickupState.IDLE)
-            self.ball_controller.stop_robot()
-            message = "拾取模式已关闭"
+        with self._cycle_lock:
+            self.pickup_mode = not self.pickup_mode
+            
+            if self.pickup_mode:
+                self._change_state(PickupState.SEARCHING)
+                self.ball_controller.reset_pid()
+                self._start_tracker_thread()
+                message = "拾取模式已开启，开始搜索网球"
+            else:
+                self._change_state(PickupState.IDLE)
+                self.ball_controller.stop_robot(force=True)
+                message = "拾取模式已关闭"
         
         # 发送状态更新
         if self.socketio:
-            self.socketio.emit('pickup_mode_update', {
+            self._send('pickup_mode_update', {
                 'enabled': self.pickup_mode,
-                'current_state': self.current_state.value,
+                'current_state': self._current_state_value,
                 'message': message
             })
         
         return {
             'status': 'success',
             'pickup_mode': self.pickup_mode,
-            'current_state': self.current_state.value,
+            'current_state': self._current_state_value,
             'message': message
         }
     
-    def _update_detection_history(self, has_ball: bool, target_ball: Optional[dict] = None):
+    def _update_detection_history(self, has_ball: bool):
         """
         更新检测历史记录
         
         Args:
             has_ball: 当前帧是否检测到球
-            target_ball: 目标球信息（如果有的话）
         """
-        # 添加当前帧的检测结果
-        detection_data = {
-            'has_ball': has_ball,
-            'target_ball': target_ball,
-            'timestamp': time.time()
-        }
-        
-        self.detection_history.append(detection_data)
-        
-        # 保持历史记录长度不超过最大值
-        if len(self.detection_history) > self.max_history_frames:
-            self.detection_history.pop(0)
+        # 增量维护连续帧计数
+        if has_ball:
+            self._consec_has_ball += 1
+            self._consec_no_ball = 0
+        else:
+            self._consec_no_ball += 1
+            self._consec_has_ball = 0
     
     def _check_consecutive_detection(self, expected_state: bool) -> bool:
         """
@@ -138,68 +193,127 @@ class BallTracker:
         Returns:
             bool: 是否有连续required_consecutive_frames帧的期望状态
         """
-        if len(self.detection_history) < self.required_consecutive_frames:
-            return False
-        
-        # 检查最近的required_consecutive_frames帧
-        recent_frames = self.detection_history[-self.required_consecutive_frames:]
-        
-        # 检查是否所有帧都符合期望状态
-        for frame in recent_frames:
-            if frame['has_ball'] != expected_state:
-                return False
-        
-        return True
+        consecutive = self._consec_has_ball if expected_state else self._consec_no_ball
+        return consecutive >= self.required_consecutive_frames
     
     def _reset_detection_history(self):
         """重置检测历史记录"""
-        self.detection_history = []
+        self._consec_has_ball = 0
+        self._consec_no_ball = 0
     
-    def _change_state(self, new_state: PickupState):
+    def _change_state(self, new_state: PickupState, now: Optional[float] = None):
         """
         改变状态机状态
         
         Args:
             new_state: 新状态
+            now: 当前单调时钟时间，None表示自动获取
         """
-        if self.current_state != new_state:
-            old_state = self.current_state
+        if self.current_state is not new_state:
+            old_value = self._current_state_value
             self.current_state = new_state
-            self.state_start_time = time.time()
-            self.tracking_stats['current_state'] = new_state.value
+            self._current_state_value = new_value = new_state.value
+            self.state_start_time = time.monotonic() if now is None else now
+            self.tracking_stats['current_state'] = new_value
             
             # 状态切换时重置检测历史，确保新状态从干净的历史开始
             self._reset_detection_history()
             
-            print(f"状态变化: {old_state.value} -> {new_state.value}")
+            print(f"状态变化: {old_value} -> {new_value}")
             
             # 发送状态变化通知
             if self.socketio:
-                self.socketio.emit('state_change', {
-                    'old_state': old_state.value,
-                    'new_state': new_state.value,
+                self._emit('state_change', {
+                    'old_state': old_value,
+                    'new_state': new_value,
                     'timestamp': time.time()
                 })
     
     def get_pickup_status(self):
-        """获取拾取模式状态"""
+        """
+        获取拾取模式状态
+        
+        Returns:
+            状态字典，其中 stats 直接引用内部的 tracking_stats，调用方只读不可修改
+        """
         return {
             'pickup_mode': self.pickup_mode,
-            'current_state': self.current_state.value,
-            'state_duration': time.time() - self.state_start_time if self.state_start_time > 0 else 0,
-            'stats': self.tracking_stats.copy()
+            'current_state': self._current_state_value,
+            'state_duration': time.monotonic() - self.state_start_time if self.state_start_time > 0 else 0,
+            'stats': self.tracking_stats
         }
     
-    def process_detections(self, boxes: List, scores: List, frame_shape: Tuple[int, int, int]):
+    def process_detections(self, boxes: np.ndarray, scores: np.ndarray, frame_shape: Tuple[int, int, int]):
         """
-        处理检测结果并执行状态机控制
+        提交检测结果，由跟踪线程执行状态机控制
+        
+        只保存最新一帧后立即返回，不阻塞视觉线程
         
         Args:
-            boxes: 检测框列表 [[x1, y1, x2, y2], ...]
-            scores: 置信度列表
+            boxes: 检测框数组 (N, 4)，即检测器输出，也接受 [[x1, y1, x2, y2], ...] 列表
+            scores: 置信度数组 (N,)
             frame_shape: 帧尺寸 (height, width, channels)
         """
-        if not self.pickup_mode or self.current_state == PickupState.IDLE:
+        # 枚举成员为单例，使用身份比较
+        if not self.pickup_mode or self.current_state is PickupState.IDLE:
+            return
+        
+        detections = (boxes, scores, frame_shape)
+        try:
+            self._detections_queue.put_nowait(detections)
+        except queue.Full:
+            try:
+                self._detections_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._detections_queue.put_nowait(detections)
+    
+    def _start_tracker_thread(self):
+        """启动跟踪线程（只启动一次）"""
+        if self._tracker_thread is None:
+            self._tracker_thread = threading.Thread(target=self._tracker_loop, daemon=True)
+            self._tracker_thread.start()
+    
+    def _tracker_loop(self):
+        """跟踪线程：取出最新的检测结果并执行一次控制周期"""
+        get_detections = self._detections_queue.get
+        while True:
+            detections = get_detections()
+            try:
+                self._run_cycle(*detections)
+            except Exception as e:
+                print(f"球跟踪处理错误: {e}")
+    
+    def _run_cycle(self, boxes: np.ndarray, scores: np.ndarray, frame_shape: Tuple[int, int, int]):
+        """
+        执行一次跟踪控制周期
+        
+        Args:
+            boxes: 检测框数组 (N, 4)
+            scores: 置信度数组 (N,)
+            frame_shape: 帧尺寸 (height, width, channels)
+        """
+        with self._cycle_lock:
+            # 提交后可能已关闭拾取模式或紧急停止
+            if not self.pickup_mode or self.current_state is PickupState.IDLE:
+                return
+            
+            self._batching = True
+            try:
+                # 每帧只取一次时间，计时统一使用单调时钟
+                self._process_detections(boxes, scores, frame_shape, time.monotonic())
+            finally:
+                self._batching = False
+                self._flush_events()
+    
+    def _process_detections(self, boxes: np.ndarray, scores: np.ndarray, frame_shape: Tuple[int, int, int],
+                            now: float):
+        """处理检测结果并执行状态机控制（事件由 _run_cycle 统一发送）"""
+        if len(boxes) == 0:
+            # 没有检测结果时无需经过控制器过滤，直接按无球处理
+            self._update_detection_history(False)
+            self._process_state_machine(None, now)
+            self._emit_stats_if_due(now)
             return
         
         # 更新控制器的屏幕尺寸
@@ -208,61 +322,72 @@ class BallTracker:
         # 使用控制器过滤有效检测
         valid_balls = self.ball_controller.filter_valid_detections(boxes, scores)
         
-        if valid_balls:
-            self.last_detection_time = time.time()
-            self.tracking_stats['total_detections'] += len(valid_balls)
+        if valid_balls.size:
+            self.last_detection_time = now
+            self.tracking_stats['total_detections'] += valid_balls.size
             
             # 使用控制器选择目标球（选择最大的球）
-            target_ball = self.ball_controller.select_target_ball(valid_balls, 'largest')
+            target_index = self.ball_controller.select_target_ball(valid_balls, 'largest')
             
-            if target_ball:
+            if target_index is not None:
+                target_ball = valid_balls[target_index]
+                
                 # 更新检测历史：有球
-                self._update_detection_history(True, target_ball)
+                self._update_detection_history(True)
                 
                 self.target_ball = target_ball
-                self.last_ball_area = target_ball['area']
-                self._process_state_machine(target_ball)
+                self.last_ball_area = float(target_ball.area)
+                self._process_state_machine(target_ball, now)
                 self.tracking_stats['successful_tracks'] += 1
             else:
                 # 更新检测历史：无球
                 self._update_detection_history(False)
-                self._process_state_machine(None)
+                self._process_state_machine(None, now)
         else:
             # 没有检测到球，更新检测历史
             self._update_detection_history(False)
-            self._process_state_machine(None)
+            self._process_state_machine(None, now)
+        
+        self._emit_stats_if_due(now)
     
-    def _process_state_machine(self, target_ball: Optional[dict]):
+    def _emit_stats_if_due(self, now: float):
+        """
+        距上次发送超过 stats_interval 时发送统计信息
+        
+        只发送相对上次有变化的键，由前端合并；没有变化时不发送
+        
+        Args:
+            now: 当前单调时钟时间
+        """
+        if self.socketio and now - self._last_stats_emit >= self.stats_interval:
+            self._last_stats_emit = now
+            sent = self._sent_stats
+            changed = {key: value for key, value in self.tracking_stats.items()
+                       if sent.get(key) != value}
+            if changed:
+                sent.update(changed)
+                self._emit('stats_update', changed)
+    
+    def _process_state_machine(self, target_ball: Optional[np.record], now: Optional[float] = None):
         """
         处理状态机逻辑
         
         Args:
             target_ball: 目标球信息，None表示没有检测到球
+            now: 当前单调时钟时间，None表示自动获取
         """
-        current_time = time.time()
-        state_duration = current_time - self.state_start_time
-        
-        if self.current_state == PickupState.SEARCHING:
-            self._handle_searching_state(target_ball)
-            
-        elif self.current_state == PickupState.TRACKING:
-            self._handle_tracking_state(target_ball, state_duration)
-            
-        elif self.current_state == PickupState.APPROACHING:
-            self._handle_approaching_state(target_ball, state_duration)
-            
-        elif self.current_state == PickupState.BACKING_UP:
-            self._handle_backing_up_state(state_duration)
-            
-        elif self.current_state == PickupState.ROTATING_SEARCH:
-            self._handle_rotating_search_state(target_ball, state_duration)
-            
-        elif self.current_state == PickupState.COMPLETED:
-            self._handle_completed_state()
+        if now is None:
+            now = time.monotonic()
+        self._tick_time = now  # 供状态处理函数中的PID计算使用同一时间
+        state_duration = now - self.state_start_time
+        
+        handler = self._state_handlers.get(self._current_state_value)
+        if handler is not None:
+            handler(target_ball, state_duration)
     
-    def _handle_searching_state(self, target_ball: Optional[dict]):
+    def _handle_searching_state(self, target_ball: Optional[np.record], state_duration: float = 0.0):
         """处理搜索状态"""
-        if target_ball:
+        if target_ball is not None:
             # 检查是否连续3帧都检测到球
             if self._check_consecutive_detection(True):
                 # 连续检测到球，开始追踪
@@ -275,9 +400,9 @@ class BallTracker:
             # 继续搜索，保持静止或缓慢旋转
             self.ball_controller.stop_robot()
     
-    def _handle_tracking_state(self, target_ball: Optional[dict], state_duration: float):
+    def _handle_tracking_state(self, target_ball: Optional[np.record], state_duration: float):
         """处理追踪状态"""
-        if not target_ball:
+        if target_ball is None:
             # 检查是否连续3帧都没有检测到球
             if self._check_consecutive_detection(False):
                 # 连续丢失球，回到搜索状态
@@ -307,9 +432,9 @@ class BallTracker:
             self.ball_controller.stop_robot()
             self._emit_message("追踪超时，重新搜索")
     
-    def _handle_approaching_state(self, target_ball: Optional[dict], state_duration: float):
+    def _handle_approaching_state(self, target_ball: Optional[np.record], state_duration: float):
         """处理接近状态"""
-        if not target_ball:
+        if target_ball is None:
             # 检查是否连续3帧都没有检测到球（表示拾取成功）
             if self._check_consecutive_detection(False):
                 # 连续没有检测到球，视野中没有球了，表示拾取成功
@@ -339,7 +464,7 @@ class BallTracker:
             self._emit_message("接近超时，重新搜索")
     
     
-    def _handle_backing_up_state(self, state_duration: float):
+    def _handle_backing_up_state(self, target_ball: Optional[np.record], state_duration: float):
         """处理后退状态"""
         if state_duration < self.backup_duration:
             # 继续后退
@@ -352,9 +477,9 @@ class BallTracker:
             self.total_rotation = 0
             self._emit_message("后退完成，开始360度搜索")
     
-    def _handle_rotating_search_state(self, target_ball: Optional[dict], state_duration: float):
+    def _handle_rotating_search_state(self, target_ball: Optional[np.record], state_duration: float):
         """处理360度搜索状态"""
-        if target_ball:
+        if target_ball is not None:
             # 检查是否连续3帧都检测到球
             if self._check_consecutive_detection(True):
                 # 连续检测到新球，停止搜索，开始追踪
@@ -380,47 +505,111 @@ class BallTracker:
             self._change_state(PickupState.COMPLETED)
             self._emit_message("360度搜索完成，拾取任务结束")
     
-    def _handle_completed_state(self):
+    def _handle_completed_state(self, target_ball: Optional[np.record] = None, state_duration: float = 0.0):
         """处理完成状态"""
         # 保持停止状态
         self.ball_controller.stop_robot()
         # 可以选择自动关闭拾取模式或等待用户操作
     
-    def _track_ball_to_center(self, target_ball: dict):
+    def _track_ball_to_center(self, target_ball: np.record):
         """
         跟踪目标球并控制机器人旋转到中心
         
         Args:
             target_ball: 目标球信息
         """
-        distance_to_center = target_ball['distance_to_center']
+        # 一次性取出记录的全部字段（Python原生数值），后续不再逐字段访问
+        _, center_x, center_y, score, distance_sq, area = target_ball.item()
+        distance_to_center = math.sqrt(distance_sq)
         
         # 更新统计信息
-        self.tracking_stats['last_target_distance'] = float(distance_to_center)
+        self.tracking_stats['last_target_distance'] = distance_to_center
         
         # 使用控制器计算控制输出
-        control_output = self.ball_controller.calculate_control_output(target_ball)
+        control_output = self.ball_controller.calculate_control_output(target_ball, self._tick_time)
         
         # 发送控制命令
         self.ball_controller.send_rotation_command(control_output['angular_velocity'])
         
         # 发送跟踪状态更新
-        if self.socketio:
-            self.socketio.emit('ball_tracking_update', {
+        # 消息在发送线程中序列化，每次新建字典
+        now = self._tick_time if self._tick_time is not None else time.monotonic()
+        if self.socketio and now - self._last_tracking_emit >= self.tracking_emit_interval:
+            self._last_tracking_emit = now
+            self._emit('ball_tracking_update', {
                 'target_ball': {
-                    'center': [float(target_ball['center'][0]), float(target_ball['center'][1])],
-                    'score': float(target_ball['score']),
-                    'distance_to_center': float(distance_to_center),
-                    'area': float(target_ball['area'])
+                    'center': [center_x, center_y],
+                    'score': score,
+                    'distance_to_center': distance_to_center,
+                    'area': area
                 },
                 'control': {
-                    'error': float(control_output['error']),
-                    'angular_velocity': float(control_output['angular_velocity'])
+                    'error': control_output['error'],
+                    'angular_velocity': control_output['angular_velocity']
                 },
-                'state': self.current_state.value,
-                'stats': self.tracking_stats
+                'state': self._current_state_value
             })
     
+    def _emit(self, event: str, payload: dict):
+        """
+        发送事件，跟踪线程处理检测结果期间先缓存，由 _flush_events 合并发送
+        
+        Args:
+            event: 事件名
+            payload: 事件数据
+        """
+        if self._batching and threading.current_thread() is self._tracker_thread:
+            self._pending_events.append((event, payload))
+        else:
+            self._send(event, payload)
+    
+    def _flush_events(self):
+        """将缓存的事件合并为一条 frame_batch 发送，只有一个事件时直接发送"""
+        if not self._pending_events:
+            return
+        events, self._pending_events = self._pending_events, []
+        if len(events) == 1:
+            self._send(*events[0])
+        else:
+            self._send('frame_batch', events)
+    
+    def _send(self, event, payload):
+        """
+        将事件放入发送队列
+        
+        COALESCED_EVENTS 中的事件在前一条尚未发出时合并到待发数据中（stats_update 为增量，
+        按键合并；ball_tracking_update 键相同，即取最新值），队列中不会积压；其他事件始终入队
+        
+        Args:
+            event: 事件名
+            payload: 事件数据
+        """
+        if event in COALESCED_EVENTS:
+            with self._coalesce_lock:
+                pending = self._coalesced_payloads.get(event)
+                if pending is not None:
+                    pending.update(payload)
+                    return
+                self._coalesced_payloads[event] = payload
+            self._emit_queue.put((event, None))
+        else:
+            self._emit_queue.put((event, payload))
+    
+    def _emit_loop(self):
+        """发送线程：从队列取出事件并通过WebSocket发出"""
+        # 循环外绑定方法，避免每个事件重复属性查找
+        get_event = self._emit_queue.get
+        emit = self.socketio.emit
+        while True:
+            event, payload = get_event()
+            if payload is None:
+                with self._coalesce_lock:
+                    payload = self._coalesced_payloads.pop(event)
+            try:
+                emit(event, payload)
+            except Exception as e:
+                print(f"发送{event}事件失败: {e}")
+    
     def _emit_message(self, message: str):
         """
         发送消息到前端
@@ -428,13 +617,13 @@ class BallTracker:
         Args:
             message: 要发送的消息
         """
-        print(f"[{self.current_state.value}] {message}")
+        print(f"[{self._current_state_value}] {message}")
         if self.socketio:
-            self.socketio.emit('pickup_status_update', {
-                'state': self.current_state.value,
+            self._emit('pickup_status_update', {
+                'state': self._current_state_value,
                 'message': message,
                 'timestamp': time.time(),
-                'stats': self.tracking_stats
+                'stats': self.tracking_stats.copy()
             })
     
     def update_parameters(self, params: dict):
@@ -444,21 +633,18 @@ class BallTracker:
         Args:
             params: 参数字典
         """
-        # 更新状态机参数
-        if 'pickup_timeout' in params:
-            self.pickup_timeout = max(1.0, min(10.0, params['pickup_timeout']))
-        
-        if 'backup_duration' in params:
-            self.backup_duration = max(0.5, min(5.0, params['backup_duration']))
-        
-        if 'search_timeout' in params:
-            self.search_timeout = max(5.0, min(30.0, params['search_timeout']))
-        
-        if 'rotation_speed' in params:
-            self.rotation_speed = max(0.1, min(1.0, params['rotation_speed']))
-        
-        # 委托给控制器更新其他参数
-        return self.ball_controller.update_parameters(params)
+        # 锁外完成限幅，在两个跟踪周期之间一次性写入全部参数
+        updates = {}
+        for name, (low, high) in STATE_PARAMETER_LIMITS.items():
+            if name in params:
+                updates[name] = max(low, min(high, params[name]))
+        
+        with self._cycle_lock:
+            for name, value in updates.items():
+                setattr(self, name, value)
+            
+            # 委托给控制器更新其他参数
+            return self.ball_controller.update_parameters(params)
     
     def get_current_parameters(self):
         """获取当前参数"""
@@ -483,7 +669,7 @@ class BallTracker:
             'successful_tracks': 0,
             'center_hits': 0,
             'balls_picked': 0,
-            'current_state': self.current_state.value,
+            'current_state': self._current_state_value,
             'last_target_distance': 0
         }
         
@@ -494,12 +680,13 @@ class BallTracker:
     
     def emergency_stop(self):
         """紧急停止"""
-        self.ball_controller.stop_robot()
-        self._change_state(PickupState.IDLE)
-        self.pickup_mode = False
+        with self._cycle_lock:
+            self.ball_controller.stop_robot(force=True)
+            self._change_state(PickupState.IDLE)
+            self.pickup_mode = False
         
         if self.socketio:
-            self.socketio.emit('emergency_stop', {
+            self._send('emergency_stop', {
                 'message': '紧急停止已执行',
                 'timestamp': time.time()
             })
@@ -512,8 +699,9 @@ class BallTracker:
     def restart_pickup(self):
         """重启拾取过程"""
         if self.pickup_mode:
-            self._change_state(PickupState.SEARCHING)
-            self.ball_controller.reset_pid()
+            with self._cycle_lock:
+                self._change_state(PickupState.SEARCHING)
+                self.ball_controller.reset_pid()
             self._emit_message("重启拾取过程，开始搜索")
             
             return {
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JPEG编码模块
+视频流和截图使用，优先使用libjpeg-turbo（PyTurboJPEG，NEON/SSE2加速）
+未安装PyTurboJPEG或找不到libturbojpeg动态库时退回cv2.imencode
+"""
+
+import cv2
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+except ImportError:
+    TurboJPEG = None
+
+_turbo = None
+if TurboJPEG is not None:
+    try:
+        _turbo = TurboJPEG()
+    except (OSError, RuntimeError) as e:
+        print(f"libturbojpeg加载失败，使用OpenCV编码JPEG: {e}")
+
+
+def encode_jpeg(frame, quality=85):
+    """
+    将BGR图像编码为JPEG
+
+    Args:
+        frame: BGR图像 (H, W, 3)
+        quality: JPEG质量 (1-100)
+
+    Returns:
+        JPEG字节串，编码失败时返回None
+    """
+    if _turbo is not None:
+        # 与OpenCV默认一致使用4:2:0色度采样
+        return _turbo.encode(frame, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ret:
+        return None
+    return buffer.tobytes()
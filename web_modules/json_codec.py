@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码模块
+供Socket.IO序列化消息和Flask接口响应使用，优先使用orjson，可直接序列化NumPy数值和数组
+未安装orjson时退回标准库json
+"""
+
+import json
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """标准库json无法处理的NumPy类型转换为Python原生类型"""
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, **kwargs):
+        """
+        序列化为JSON字符串
+
+        Args:
+            obj: 要序列化的对象
+            **kwargs: 兼容标准库json.dumps的参数（如separators），orjson输出本身即为紧凑格式
+
+        Returns:
+            JSON字符串
+        """
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode('utf-8')
+
+    def dumpb(obj):
+        """
+        序列化为JSON字节串，供HTTP响应直接使用
+
+        Args:
+            obj: 要序列化的对象
+
+        Returns:
+            UTF-8编码的JSON字节串
+        """
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(s, **kwargs):
+        """
+        解析JSON字符串
+
+        Args:
+            s: JSON字符串或字节
+            **kwargs: 兼容标准库json.loads的参数
+
+        Returns:
+            解析后的对象
+        """
+        return orjson.loads(s)
+else:
+    def dumps(obj, **kwargs):
+        """序列化为JSON字符串（标准库实现）"""
+        kwargs.setdefault('default', _default)
+        return json.dumps(obj, **kwargs)
+
+    def dumpb(obj):
+        """序列化为JSON字节串（标准库实现）"""
+        return dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(s, **kwargs):
+        """解析JSON字符串（标准库实现）"""
+        return json.loads(s, **kwargs)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON提供器，jsonify 和 request.get_json 使用本模块的编解码，输出紧凑格式"""
+    
+    compact = True
+    
+    def dumps(self, obj, **kwargs):
+        """序列化为JSON字符串（忽略缩进、排序等格式参数）"""
+        return dumps(obj)
+    
+    def loads(self, s, **kwargs):
+        """解析JSON字符串"""
+        return loads(s)
+    
+    def response(self, *args, **kwargs):
+        """生成JSON响应，orjson输出的字节串直接作为响应体，不经过str中转"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumpb(obj) + b"\n", mimetype=self.mimetype)
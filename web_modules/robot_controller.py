@@ -9,6 +9,19 @@ from base_robot.wheeltec_robot import WheelTecRobot
 from base_robot.wheeltec_robot_config import WheelTecRobotConfig, CallbackConfig
 
 
+# 运动命令表：命令 -> (x方向系数, y方向系数, 旋转系数)
+# x、y乘以当前线速度，旋转乘以当前角速度
+MOTION_COMMANDS = {
+    'forward': (1.0, 0.0, 0.0),
+    'backward': (-1.0, 0.0, 0.0),
+    'left_translate': (0.0, 1.0, 0.0),    # A键：左平移
+    'right_translate': (0.0, -1.0, 0.0),  # D键：右平移
+    'rotate_left': (0.0, 0.0, 1.0),       # Q键：逆时针旋转
+    'rotate_right': (0.0, 0.0, -1.0),     # E键：顺时针旋转
+    'stop': (0.0, 0.0, 0.0)
+}
+
+
 class RobotController:
     """机器人控制器"""
     
@@ -27,8 +40,10 @@ class RobotController:
         self.robot_callbacks = None
         self.robot_running = False
         
-        # 当前速度状态
+        # 当前速度状态（原地更新，不重新分配）
         self.current_velocity = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+        # set_velocity 成功时复用的返回结果，调用方只读取不修改
+        self._velocity_success = {'status': 'success', 'velocity': self.current_velocity}
         
         # 速度设置
         self.base_speed_linear = 0.3  # 基础线速度 m/s
@@ -107,13 +122,13 @@ class RobotController:
             # 停止机器人控制
             self.robot.stop()
             self.robot_running = False
-            self.current_velocity = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+            self._update_current_velocity(0.0, 0.0, 0.0)
             
             return {'status': 'success', 'message': '机器人已停止'}
             
         except Exception as e:
             self.robot_running = False  # 确保状态一致
-            self.current_velocity = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+            self._update_current_velocity(0.0, 0.0, 0.0)
             return {'status': 'error', 'message': f'机器人停止失败: {str(e)}'}
     
     def set_velocity(self, linear_x=0.0, linear_y=0.0, angular_z=0.0):
@@ -121,48 +136,62 @@ class RobotController:
         try:
             if self.robot_running and self.robot:
                 self.robot.set_velocity(linear_x, linear_y, angular_z)
-                self.current_velocity = {'x': linear_x, 'y': linear_y, 'z': angular_z}
-                return {'status': 'success', 'velocity': self.current_velocity}
+                self._update_current_velocity(linear_x, linear_y, angular_z)
+                return self._velocity_success
             else:
                 return {'status': 'error', 'message': '机器人未运行'}
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
+    def set_velocity_fast(self, linear_x, linear_y, angular_z):
+        """
+        设置机器人速度（控制循环使用）
+        
+        不包装异常、不构建返回字典，串口异常由调用方处理
+        
+        Args:
+            linear_x: X轴线速度 (m/s)
+            linear_y: Y轴线速度 (m/s)
+            angular_z: Z轴角速度 (rad/s)
+            
+        Returns:
+            True如果命令已发送，机器人未运行时返回False
+        """
+        if not (self.robot_running and self.robot):
+            return False
+        self.robot.set_velocity(linear_x, linear_y, angular_z)
+        self._update_current_velocity(linear_x, linear_y, angular_z)
+        return True
+    
+    def _update_current_velocity(self, linear_x, linear_y, angular_z):
+        """原地更新当前速度状态"""
+        velocity = self.current_velocity
+        velocity['x'] = linear_x
+        velocity['y'] = linear_y
+        velocity['z'] = angular_z
+    
     def handle_control_command(self, command):
         """处理机器人控制命令"""
         try:
             if not (self.robot_running and self.robot):
                 return {'status': 'error', 'message': '机器人未运行'}
             
-            # 计算当前实际速度值
-            speed_linear = self.base_speed_linear * self.speed_multiplier
-            speed_angular = self.base_speed_angular * self.speed_multiplier
-            
-            if command == 'forward':
-                self.robot.set_velocity(speed_linear, 0.0, 0.0)
-                self.current_velocity = {'x': speed_linear, 'y': 0.0, 'z': 0.0}
-            elif command == 'backward':
-                self.robot.set_velocity(-speed_linear, 0.0, 0.0)
-                self.current_velocity = {'x': -speed_linear, 'y': 0.0, 'z': 0.0}
-            elif command == 'left_translate':  # A键：左平移
-                self.robot.set_velocity(0.0, speed_linear, 0.0)
-                self.current_velocity = {'x': 0.0, 'y': speed_linear, 'z': 0.0}
-            elif command == 'right_translate':  # D键：右平移
-                self.robot.set_velocity(0.0, -speed_linear, 0.0)
-                self.current_velocity = {'x': 0.0, 'y': -speed_linear, 'z': 0.0}
-            elif command == 'rotate_left':  # Q键：逆时针旋转
-                self.robot.set_velocity(0.0, 0.0, speed_angular)
-                self.current_velocity = {'x': 0.0, 'y': 0.0, 'z': speed_angular}
-            elif command == 'rotate_right':  # E键：顺时针旋转
-                self.robot.set_velocity(0.0, 0.0, -speed_angular)
-                self.current_velocity = {'x': 0.0, 'y': 0.0, 'z': -speed_angular}
+            motion = MOTION_COMMANDS.get(command)
+            if motion is not None:
+                # 按当前速度倍数换算实际速度
+                speed_linear = self.base_speed_linear * self.speed_multiplier
+                speed_angular = self.base_speed_angular * self.speed_multiplier
+                x_factor, y_factor, z_factor = motion
+                linear_x = x_factor * speed_linear
+                linear_y = y_factor * speed_linear
+                angular_z = z_factor * speed_angular
+                
+                self.robot.set_velocity(linear_x, linear_y, angular_z)
+                self._update_current_velocity(linear_x, linear_y, angular_z)
             elif command == 'speed_up':  # C键：加速
                 return self.increase_speed()
             elif command == 'speed_down':  # Z键：减速
                 return self.decrease_speed()
-            elif command == 'stop':
-                self.robot.set_velocity(0.0, 0.0, 0.0)
-                self.current_velocity = {'x': 0.0, 'y': 0.0, 'z': 0.0}
             
             return {'status': 'success', 'velocity': self.current_velocity, 'speed_multiplier': self.speed_multiplier}
         except Exception as e:
@@ -7,27 +7,54 @@
 
 import os
 import time
+import queue
 import threading
-import cv2
 import numpy as np
 
-from vision.tennis_detector import TennisDetector
+from vision.tennis_detector import create_detector
 from vision.camera_manager import CameraConfig, CameraManager, PerformanceMonitor
+from vision.motion_gate import MotionGate
+from .jpeg_codec import encode_jpeg
+
+# MJPEG流每帧的分段头，Content-Length让浏览器无需扫描边界即可取出整帧
+MJPEG_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+
+
+def mjpeg_part(jpeg_bytes):
+    """
+    将JPEG数据封装为MJPEG流的一个分段
+    
+    Args:
+        jpeg_bytes: JPEG字节串
+        
+    Returns:
+        包含分段头和结尾换行的完整字节串
+    """
+    return b''.join((MJPEG_PART_HEADER, str(len(jpeg_bytes)).encode('ascii'), b'\r\n\r\n',
+                     jpeg_bytes, b'\r\n'))
 
 
 class VisionProcessor:
     """视觉处理器"""
     
-    def __init__(self, socketio=None, model_path="vision/model/model_float32_myv8_2.tflite"):
+    def __init__(self, socketio=None, model_path="vision/model/model_float32_myv8_2.tflite", input_size=None,
+                 backend=None, num_threads=None, motion_gate=False):
         """
         初始化视觉处理器
         
         Args:
             socketio: WebSocket对象，用于发送状态更新
             model_path: 模型文件路径
+            input_size: 网络输入边长，None表示使用模型自带尺寸
+            backend: 推理后端 "tflite" 或 "ncnn"，None表示按模型路径自动判断
+            num_threads: 推理线程数，None表示由检测器决定
+            motion_gate: 是否启用运动门控（画面静止时复用检测结果），默认关闭
         """
         self.socketio = socketio
         self.model_path = model_path
+        self.input_size = input_size
+        self.backend = backend
+        self.num_threads = num_threads
         self.ball_tracker = None  # 将在主控制器中设置
         
         # 视觉相关
@@ -41,6 +68,22 @@ class VisionProcessor:
         self.detection_boxes = []
         self.detection_scores = []
         
+        # 画面静止时复用检测结果（机器人运动时由BallController使其失效），None表示不启用
+        # 拾取模式下跟踪器需要每帧的新检测结果，不使用门控
+        self.motion_gate = MotionGate() if motion_gate else None
+        
+        # 视频流JPEG：每帧只在视觉线程编码并封装一次，所有客户端共享同一份MJPEG分段
+        self._jpeg_cv = threading.Condition()
+        self._stream_part = None
+        self._jpeg_seq = 0         # 每编码一帧加一，客户端据此判断是否有新帧
+        self._stream_clients = 0   # 当前视频流客户端数，为0时不编码
+        self._blank_part = None
+        
+        # 视频流JPEG质量，由系统监控按CPU占用在 [min, max] 范围内调整
+        self.stream_quality = 75
+        self.min_stream_quality = 50
+        self.max_stream_quality = 85
+        
         # 初始化视觉系统
         self._init_vision()
     
@@ -53,10 +96,13 @@ class VisionProcessor:
                 return
             print("使用模型:", self.model_path)
             # 初始化检测器
-            self.detector = TennisDetector(
+            self.detector = create_detector(
                 self.model_path,
+                backend=self.backend,
                 confidence_threshold=0.6,
-                iou_threshold=0.5
+                iou_threshold=0.5,
+                input_size=self.input_size,
+                num_threads=self.num_threads
             )
             
             # 初始化摄像头管理器
@@ -112,7 +158,7 @@ class VisionProcessor:
         """获取视觉系统状态"""
         return {
             'running': self.vision_running,
-            'detections': len(self.detection_boxes) if self.detection_boxes else 0,
+            'detections': len(self.detection_boxes),
             'fps': self.perf_monitor.get_fps() if self.perf_monitor else 0
         }
     
@@ -131,13 +177,12 @@ class VisionProcessor:
                 timestamp = int(time.time())
                 filename = f"original_{timestamp}.jpg"
                 # 编码图像为JPEG格式
-                ret, buffer = cv2.imencode('.jpg', self.original_frame, 
-                                         [cv2.IMWRITE_JPEG_QUALITY, 95])
-                if ret:
+                data = encode_jpeg(self.original_frame, 95)
+                if data is not None:
                     return {
                         'status': 'success',
                         'filename': filename,
-                        'data': buffer.tobytes(),
+                        'data': data,
                         'message': '原始图像截取成功'
                     }
                 else:
@@ -154,13 +199,12 @@ class VisionProcessor:
                 timestamp = int(time.time())
                 filename = f"detection_{timestamp}.jpg"
                 # 编码图像为JPEG格式
-                ret, buffer = cv2.imencode('.jpg', self.current_frame, 
-                                         [cv2.IMWRITE_JPEG_QUALITY, 95])
-                if ret:
+                data = encode_jpeg(self.current_frame, 95)
+                if data is not None:
                     return {
                         'status': 'success',
                         'filename': filename,
-                        'data': buffer.tobytes(),
+                        'data': data,
                         'message': '检测画面截取成功'
                     }
                 else:
@@ -171,8 +215,17 @@ class VisionProcessor:
             return {'status': 'error', 'message': str(e)}
     
     def _start_vision_thread(self):
-        """启动视觉处理线程"""
-        def vision_loop():
+        """启动视觉处理线程（采集预处理、推理、画面发布三个线程组成流水线）"""
+        # 采集线程只保留最新一帧，推理跟不上时丢弃旧帧避免延迟累积
+        frame_queue = queue.Queue(maxsize=1)
+        # 推理结果交给发布线程绘制、编码和推送，同样只保留最新一帧
+        result_queue = queue.Queue(maxsize=1)
+        # 预分配的输入张量池：推理中、队列中、正在写入各占一个
+        free_buffers = queue.Queue()
+        for _ in range(3):
+            free_buffers.put(self.detector.create_input_buffer())
+        
+        def capture_loop():
             while self.vision_running:
                 try:
                     if not self.camera_manager:
@@ -181,35 +234,69 @@ class VisionProcessor:
                     # 获取帧
                     ret, frame = self.camera_manager.get_latest_frame()
                     if not ret or frame is None:
+                        time.sleep(0.01)
                         continue
                     
-                    # 保存原始帧
-                    self.original_frame = frame.copy()
+                    # 预处理与推理并行进行
+                    input_image = self.detector.preprocess_image(frame, out=free_buffers.get())
+                    try:
+                        frame_queue.put_nowait((frame, input_image))
+                    except queue.Full:
+                        try:
+                            _, stale_input = frame_queue.get_nowait()
+                            free_buffers.put(stale_input)
+                        except queue.Empty:
+                            pass
+                        frame_queue.put_nowait((frame, input_image))
+                    
+                except Exception as e:
+                    print(f"图像采集错误: {e}")
+                    break
+        
+        def vision_loop():
+            while self.vision_running:
+                try:
+                    if not self.camera_manager:
+                        break
+                    
+                    try:
+                        frame, input_image = frame_queue.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
                     
-                    # 执行检测
-                    detection_start = time.time()
-                    boxes, scores = self.detector.detect(frame)
-                    detection_time = time.time() - detection_start
+                    # 保存原始帧（每帧都是摄像头新读取的数组，之后不再修改，直接引用）
+                    self.original_frame = frame
                     
-                    # 更新自适应跳帧
-                    self.camera_manager.update_adaptive_skip(detection_time)
+                    # 执行检测（启用运动门控且不在拾取模式时，画面静止则复用上次结果）
+                    # 同一个单调时钟读数既用于计时也作为运动门控的时间戳
+                    detection_start = time.monotonic()
+                    gate = self.motion_gate
+                    if gate is not None and self.ball_tracker and self.ball_tracker.pickup_mode:
+                        gate = None
+                    cached_result = gate.check(frame, detection_start) if gate is not None else None
+                    reused = cached_result is not None
+                    if reused:
+                        boxes, scores = cached_result
+                    else:
+                        boxes, scores = self.detector.detect_preprocessed(
+                            input_image, frame.shape[1], frame.shape[0]
+                        )
+                        if gate is not None:
+                            gate.update(boxes, scores, detection_start)
+                    detection_time = time.monotonic() - detection_start
+                    free_buffers.put(input_image)
                     
-                    # 绘制检测结果
-                    annotated_frame = self.detector.draw_detections(frame, boxes, scores)
+                    # 更新自适应跳帧（复用结果的耗时不代表推理耗时，不参与统计）
+                    if not reused:
+                        self.camera_manager.update_adaptive_skip(detection_time)
                     
-                    # 添加性能信息
-                    fps = self.perf_monitor.get_fps()
-                    skip_frames = self.camera_manager.get_skip_frames()
-                    info_text = f"FPS: {fps:.1f} | {detection_time*1000:.1f}ms | {len(boxes)} | Skip:{skip_frames}"
-
-
-                    # 保存当前帧和检测结果
-                    self.current_frame = annotated_frame
+                    # 保存检测结果
                     self.detection_boxes = boxes
                     self.detection_scores = scores
                     
                     # 如果有球跟踪器，处理检测结果
-                    if self.ball_tracker:
+                    # 复用的结果不是新的观测，不交给跟踪器，避免一次误检被重复计入连续帧确认
+                    if self.ball_tracker and not reused:
                         try:
                             self.ball_tracker.process_detections(boxes, scores, frame.shape)
                         except Exception as tracker_error:
@@ -218,50 +305,132 @@ class VisionProcessor:
                     
                     # 更新性能统计
                     self.perf_monitor.update_frame_count()
+                    fps = self.perf_monitor.get_fps()
                     
-                    # 发送检测结果
-                    if self.socketio:
-                        self.socketio.emit('detection_update', {
-                            'boxes': len(boxes),
-                            'fps': fps,
-                            'detection_time': detection_time * 1000
-                        })
+                    # 绘制和推送交给发布线程，推理线程直接处理下一帧
+                    result = (frame, boxes, scores, fps, detection_time)
+                    try:
+                        result_queue.put_nowait(result)
+                    except queue.Full:
+                        try:
+                            result_queue.get_nowait()
+                        except queue.Empty:
+                            pass
+                        result_queue.put_nowait(result)
                     
                 except Exception as e:
                     print(f"视觉处理错误: {e}")
                     break
-                
-                time.sleep(0.01)  # 短暂休眠
         
+        def broadcast_loop():
+            # detection_update 去重：检测数、FPS（保留一位小数）、跳帧数不变时最多每0.2秒发送一次
+            last_summary = None
+            last_emit_time = 0.0
+            while self.vision_running:
+                try:
+                    try:
+                        frame, boxes, scores, fps, detection_time = result_queue.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                    
+                    # 绘制检测结果：原始帧需保持不变，只在有检测框时复制后绘制
+                    if len(boxes):
+                        annotated_frame = self.detector.draw_detections(frame, boxes, scores)
+                    else:
+                        annotated_frame = frame
+                    
+                    # 保存当前帧
+                    self.current_frame = annotated_frame
+                    
+                    # 有客户端观看时编码一次视频帧并通知所有视频流
+                    if self._stream_clients:
+                        frame_bytes = encode_jpeg(annotated_frame, self.stream_quality)
+                        if frame_bytes is not None:
+                            part = mjpeg_part(frame_bytes)
+                            with self._jpeg_cv:
+                                self._stream_part = part
+                                self._jpeg_seq += 1
+                                self._jpeg_cv.notify_all()
+                    
+                    # 发送检测结果和性能信息，由前端显示，不在画面上绘制文字
+                    if self.socketio:
+                        skip_frames = self.camera_manager.get_skip_frames()
+                        summary = (len(boxes), round(fps, 1), skip_frames)
+                        now = time.monotonic()
+                        if summary != last_summary or now - last_emit_time >= 0.2:
+                            last_summary = summary
+                            last_emit_time = now
+                            self.socketio.emit('detection_update', {
+                                'boxes': len(boxes),
+                                'fps': fps,
+                                'detection_time': detection_time * 1000,
+                                'skip_frames': skip_frames
+                            })
+                    
+                except Exception as e:
+                    print(f"画面发布错误: {e}")
+                    break
+        
+        capture_thread = threading.Thread(target=capture_loop, daemon=True)
+        capture_thread.start()
         vision_thread = threading.Thread(target=vision_loop, daemon=True)
         vision_thread.start()
+        broadcast_thread = threading.Thread(target=broadcast_loop, daemon=True)
+        broadcast_thread.start()
+    
+    def adjust_stream_quality(self, cpu_percent):
+        """
+        根据CPU占用调整视频流JPEG质量：负载高时降低质量减少编码量，负载低时逐步恢复
+        
+        Args:
+            cpu_percent: 当前CPU占用率（%）
+            
+        Returns:
+            调整后的JPEG质量
+        """
+        if cpu_percent > 80:
+            self.stream_quality = max(self.min_stream_quality, self.stream_quality - 5)
+        elif cpu_percent < 40:
+            self.stream_quality = min(self.max_stream_quality, self.stream_quality + 5)
+        return self.stream_quality
+    
+    def _get_blank_part(self):
+        """获取空白帧的MJPEG分段（首次使用时生成并缓存）"""
+        if self._blank_part is None:
+            if os.path.exists('static/blank.jpg'):
+                # 占位图本身就是JPEG，直接读取文件内容，无需解码再编码
+                with open('static/blank.jpg', 'rb') as f:
+                    blank_jpeg = f.read()
+            else:
+                blank_jpeg = encode_jpeg(np.zeros((480, 640, 3), dtype=np.uint8), 95)
+            if blank_jpeg is not None:
+                self._blank_part = mjpeg_part(blank_jpeg)
+        return self._blank_part
     
     def generate_frames(self):
-        """生成视频帧"""
-        while True:
-            try:
-                if self.current_frame is not None:
-                    # 编码帧
-                    ret, buffer = cv2.imencode('.jpg', self.current_frame, 
-                                             [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    if ret:
-                        frame_bytes = buffer.tobytes()
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                else:
-                    # 发送空白帧
-                    blank_frame = cv2.imread('static/blank.jpg') if os.path.exists('static/blank.jpg') else \
-                                 np.zeros((480, 640, 3), dtype=np.uint8)
-                    ret, buffer = cv2.imencode('.jpg', blank_frame)
-                    if ret:
-                        frame_bytes = buffer.tobytes()
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                
-                time.sleep(0.033)  # ~30 FPS
-            except Exception as e:
-                print(f"帧生成错误: {e}")
-                time.sleep(1)
+        """生成视频帧（等待视觉线程编码好的新帧，1秒内没有新帧时重发当前帧保持连接）"""
+        last_seq = -1
+        with self._jpeg_cv:
+            self._stream_clients += 1
+        try:
+            while True:
+                try:
+                    with self._jpeg_cv:
+                        self._jpeg_cv.wait_for(lambda: self._jpeg_seq != last_seq, timeout=1.0)
+                        part = self._stream_part
+                        last_seq = self._jpeg_seq
+                    
+                    if part is None:
+                        # 视觉系统尚未产生画面，发送空白帧
+                        part = self._get_blank_part()
+                    if part is not None:
+                        yield part
+                except Exception as e:
+                    print(f"帧生成错误: {e}")
+                    time.sleep(1)
+        finally:
+            with self._jpeg_cv:
+                self._stream_clients -= 1
     
     def cleanup(self):
         """清理视觉系统资源"""
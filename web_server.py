@@ -6,15 +6,17 @@
 """
 
 import time
+import socket
 import threading
-import psutil
-import io
-from datetime import datetime
-from flask import Flask, render_template, Response, jsonify, request, send_file
+from flask import Flask, render_template, Response, jsonify, request
 from flask_socketio import SocketIO, emit
+from werkzeug.http import generate_etag
 
 # 导入模块化组件
 from web_modules import RobotController, VisionProcessor, BallTracker
+from web_modules import json_codec
+
+BYTES_TO_GB = 1.0 / (1024 ** 3)
 
 
 class WebRobotController:
@@ -22,11 +24,26 @@ class WebRobotController:
     
     def __init__(self):
         self.app = Flask(__name__)
+        self.app.json = json_codec.JSONProvider(self.app)
         self.app.config['SECRET_KEY'] = 'tennis_robot_2024'
-        self.socketio = SocketIO(self.app, cors_allowed_origins="*")
+        # 视觉、跟踪、串口均为真实线程并在线程中发送事件，使用threading模式而不是eventlet/gevent协程
+        # 安装simple-websocket后使用WebSocket传输，避免退回HTTP长轮询
+        # 显式关闭Socket.IO/Engine.IO日志，事件处理在各自线程中执行，慢处理不阻塞其他客户端
+        self.socketio = SocketIO(self.app, cors_allowed_origins="*", json=json_codec, async_mode='threading',
+                                 logger=False, engineio_logger=False, async_handlers=True)
         
-        # 系统监控
+        # 系统监控：有WebSocket客户端或视频流客户端时才运行（视频流画质随CPU负载调整）
         self.system_stats = {}
+        self._monitor_users = 0
+        self._monitor_lock = threading.Lock()
+        self._monitor_stop = None  # 当前监控任务的停止事件，None表示未运行
+        
+        # 首页内容不随请求变化，首次访问时渲染后缓存，同时缓存其ETag
+        self._index_html = None
+        self._index_etag = None
+        
+        # 每个客户端上次收到的速度倍数，未变化时不重复发送 velocity_update
+        self._sent_speed_multiplier = {}
         
         # 初始化模块化组件
         self.robot_controller = RobotController(self.socketio)
@@ -35,51 +52,113 @@ class WebRobotController:
         
         # 设置组件间的引用
         self.vision_processor.ball_tracker = self.ball_tracker
+        self.ball_tracker.ball_controller.motion_gate = self.vision_processor.motion_gate
         
         self._setup_routes()
         self._setup_socketio()
-        self._start_system_monitor()
+    
+    def _acquire_system_monitor(self):
+        """登记一个需要系统监控的客户端，第一个客户端时启动监控"""
+        with self._monitor_lock:
+            self._monitor_users += 1
+            if self._monitor_users == 1:
+                self._start_system_monitor()
+    
+    def _release_system_monitor(self):
+        """注销一个客户端，最后一个客户端离开时停止监控"""
+        with self._monitor_lock:
+            self._monitor_users -= 1
+            if self._monitor_users == 0:
+                self._stop_system_monitor()
     
     def _start_system_monitor(self):
-        """启动系统监控线程"""
+        """启动系统监控后台任务（由Socket.IO按当前async_mode创建）"""
+        # 没有客户端时不需要系统监控，psutil在此时才导入
+        import psutil
+        
+        stop_event = threading.Event()
+        self._monitor_stop = stop_event
+        
         def monitor_loop():
-            while True:
+            # 非阻塞采样：首次调用只建立基准，之后每次返回距上次调用期间的CPU占用
+            # 先等待一个周期再采样，避免刚建立基准就读取得到0%
+            psutil.cpu_percent(interval=None)
+            # 总内存在运行期间不变，只读取一次
+            memory_total = psutil.virtual_memory().total * BYTES_TO_GB
+            
+            # CPU和内存占用变化很小时不发送，每15次（约30秒）至少发送一次作为心跳
+            last_sent = None
+            tick = 0
+            while not stop_event.wait(2):  # 每2秒更新一次，停止时立即退出
                 try:
                     # 获取系统信息
-                    cpu_percent = psutil.cpu_percent(interval=1)
+                    cpu_percent = psutil.cpu_percent(interval=None)
                     memory = psutil.virtual_memory()
                     
+                    # 按CPU负载调整视频流画质
+                    self.vision_processor.adjust_stream_quality(cpu_percent)
+                    
                     self.system_stats = {
                         'cpu_percent': cpu_percent,
                         'memory_percent': memory.percent,
-                        'memory_used': memory.used / (1024**3),  # GB
-                        'memory_total': memory.total / (1024**3),  # GB
-                        'timestamp': datetime.now().strftime('%H:%M:%S')
+                        'memory_used': memory.used * BYTES_TO_GB,  # GB
+                        'memory_total': memory_total,  # GB
+                        'timestamp': time.time()  # 秒级时间戳，与其他事件一致，由前端按需格式化
                     }
                     
                     # 通过WebSocket发送系统状态
-                    self.socketio.emit('system_stats', self.system_stats)
+                    tick += 1
+                    if (last_sent is None or tick % 15 == 0
+                            or abs(cpu_percent - last_sent[0]) >= 1.0
+                            or abs(memory.percent - last_sent[1]) >= 0.5):
+                        last_sent = (cpu_percent, memory.percent)
+                        self.socketio.emit('system_stats', self.system_stats)
                     
                 except Exception as e:
                     print(f"系统监控错误: {e}")
-                
-                time.sleep(2)  # 每2秒更新一次
         
-        monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
-        monitor_thread.start()
+        self.socketio.start_background_task(monitor_loop)
+    
+    def _stop_system_monitor(self):
+        """停止系统监控后台任务"""
+        if self._monitor_stop is not None:
+            self._monitor_stop.set()
+            self._monitor_stop = None
     
     def _setup_routes(self):
         """设置路由"""
         
         @self.app.route('/')
         def index():
-            return render_template('index.html')
+            if self._index_html is None:
+                self._index_html = render_template('index.html')
+                self._index_etag = generate_etag(self._index_html.encode('utf-8'))
+            # 带ETag让浏览器重新验证，页面未变化时返回304
+            response = Response(self._index_html, mimetype='text/html')
+            response.set_etag(self._index_etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
         
         @self.app.route('/video_feed')
         def video_feed():
             """视频流路由"""
-            return Response(self.vision_processor.generate_frames(),
-                          mimetype='multipart/x-mixed-replace; boundary=frame')
+            # 关闭Nagle算法，每帧写出后立即发送，不等待与后续数据合并
+            sock = request.environ.get('werkzeug.socket')
+            if sock is not None:
+                try:
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                except OSError:
+                    pass
+            
+            def stream():
+                # 直接打开视频流（不连接WebSocket）时同样需要系统监控调整画质
+                self._acquire_system_monitor()
+                try:
+                    yield from self.vision_processor.generate_frames()
+                finally:
+                    self._release_system_monitor()
+            
+            return Response(stream(), mimetype='multipart/x-mixed-replace; boundary=frame')
         
         @self.app.route('/api/robot/start', methods=['POST'])
         def start_robot():
@@ -96,11 +175,12 @@ class WebRobotController:
         @self.app.route('/api/robot/velocity', methods=['POST'])
         def set_velocity():
             """设置机器人速度"""
+            # 解析失败时返回None，不走异常路径
+            data = request.get_json(silent=True)
+            if not data:
+                return jsonify({'status': 'error', 'message': '无效的JSON数据'})
+            
             try:
-                data = request.get_json()
-                if not data:
-                    return jsonify({'status': 'error', 'message': '无效的JSON数据'})
-                
                 linear_x = data.get('linear_x', 0.0)
                 linear_y = data.get('linear_y', 0.0)
                 angular_z = data.get('angular_z', 0.0)
@@ -125,7 +205,21 @@ class WebRobotController:
         @self.app.route('/api/system/stats')
         def get_system_stats():
             """获取系统状态"""
-            return jsonify(self.system_stats)
+            # 监控运行中且已有近期数据时直接返回
+            stats = self.system_stats
+            if stats and time.time() - stats['timestamp'] < 5:
+                return jsonify(stats)
+            
+            # 监控未运行或刚启动时当场采样（阻塞采样0.1秒得到有效的CPU占用）
+            import psutil
+            memory = psutil.virtual_memory()
+            return jsonify({
+                'cpu_percent': psutil.cpu_percent(interval=0.1),
+                'memory_percent': memory.percent,
+                'memory_used': memory.used * BYTES_TO_GB,  # GB
+                'memory_total': memory.total * BYTES_TO_GB,  # GB
+                'timestamp': time.time()
+            })
         
         @self.app.route('/api/pickup/toggle', methods=['POST'])
         def toggle_pickup_mode():
@@ -146,11 +240,11 @@ class WebRobotController:
                 params = self.ball_tracker.get_current_parameters()
                 return jsonify({'status': 'success', 'parameters': params})
             else:
+                data = request.get_json(silent=True)
+                if not data:
+                    return jsonify({'status': 'error', 'message': '无效的JSON数据'})
+                
                 try:
-                    data = request.get_json()
-                    if not data:
-                        return jsonify({'status': 'error', 'message': '无效的JSON数据'})
-                    
                     result = self.ball_tracker.update_parameters(data)
                     return jsonify(result)
                 except Exception as e:
@@ -179,15 +273,7 @@ class WebRobotController:
             """截取原始图像"""
             result = self.vision_processor.capture_original_image()
             if result['status'] == 'success':
-                # 创建内存中的文件对象
-                img_io = io.BytesIO(result['data'])
-                img_io.seek(0)
-                return send_file(
-                    img_io,
-                    mimetype='image/jpeg',
-                    as_attachment=True,
-                    download_name=result['filename']
-                )
+                return self._jpeg_attachment(result)
             else:
                 return jsonify(result), 400
         
@@ -196,31 +282,42 @@ class WebRobotController:
             """截取检测画面"""
             result = self.vision_processor.capture_detection_image()
             if result['status'] == 'success':
-                # 创建内存中的文件对象
-                img_io = io.BytesIO(result['data'])
-                img_io.seek(0)
-                return send_file(
-                    img_io,
-                    mimetype='image/jpeg',
-                    as_attachment=True,
-                    download_name=result['filename']
-                )
+                return self._jpeg_attachment(result)
             else:
                 return jsonify(result), 400
     
+    def _jpeg_attachment(self, result):
+        """
+        将截图结果作为JPEG附件返回，编码好的字节直接作为响应体
+        
+        Args:
+            result: 截图结果，包含 data 和 filename
+            
+        Returns:
+            Flask响应对象
+        """
+        return Response(result['data'], mimetype='image/jpeg', headers={
+            'Content-Disposition': f'attachment; filename="{result["filename"]}"'
+        })
+    
     def _setup_socketio(self):
         """设置WebSocket事件"""
         
         @self.socketio.on('connect')
         def handle_connect():
             print('客户端已连接')
-            robot_status = self.robot_controller.get_status()
-            vision_status = self.vision_processor.get_status()
-            emit('status', {'robot': robot_status['running'], 'vision': vision_status['running']})
+            self._acquire_system_monitor()
+            # 只需要运行标志，直接读取，不构建完整状态字典
+            emit('status', {
+                'robot': self.robot_controller.robot_running,
+                'vision': self.vision_processor.vision_running
+            })
         
         @self.socketio.on('disconnect')
         def handle_disconnect():
             print('客户端已断开连接')
+            self._sent_speed_multiplier.pop(request.sid, None)
+            self._release_system_monitor()
         
         @self.socketio.on('robot_control')
         def handle_robot_control(data):
@@ -231,11 +328,12 @@ class WebRobotController:
                 
                 if result['status'] == 'success':
                     # 发送速度倍数更新（实际速度显示由里程计数据提供）
-                    update_data = {}
-                    if 'speed_multiplier' in result:
-                        update_data['speed_multiplier'] = result['speed_multiplier']
-                    if update_data:  # 只有当有速度倍数更新时才发送
-                        emit('velocity_update', update_data)
+                    # 运动命令也会返回速度倍数，按键连发时只有倍数变化才发送
+                    speed_multiplier = result.get('speed_multiplier')
+                    if (speed_multiplier is not None
+                            and self._sent_speed_multiplier.get(request.sid) != speed_multiplier):
+                        self._sent_speed_multiplier[request.sid] = speed_multiplier
+                        emit('velocity_update', {'speed_multiplier': speed_multiplier})
                     
                     # 如果有消息（如速度调节反馈），也发送消息
                     if 'message' in result:
@@ -249,7 +347,7 @@ class WebRobotController:
         """运行服务器"""
         try:
             print(f"启动Web服务器: http://{host}:{port}")
-            self.socketio.run(self.app, host=host, port=port, debug=debug)
+            self.socketio.run(self.app, host=host, port=port, debug=debug, allow_unsafe_werkzeug=True)
         except KeyboardInterrupt:
             print("\n正在关闭服务器...")
             self._cleanup()